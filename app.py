@@ -1,23 +1,110 @@
-from flask import Flask
+from flask import Flask, Response, jsonify
+import os
+import signal
+import sys
 import threading
 import time
 import schedule
-from unipass_check import main  # 찡의 기존 자동화 함수
+from jobs import JobRunner, JOBS
+from metrics import PROMETHEUS_CONTENT_TYPE, prometheus_text
+from notion_writer import flush_and_report
+from notifier import flush_notifications
+from poll_scheduler import PollScheduler
+from state_store import get_store
+
+# ─────────────────────────────────────────────────────────────
+# 상주 데몬: 추적 스크립트를 한 프로세스 안에서 주기적으로 실행
+#
+# - 유니패스(송장 DB + 장부 DB): 건별 조회 시각은 스케줄러가 정하고, 여기서는 POLL_TICK_SECONDS 마다 깨움
+# - 그 밖의 작업은 DAEMON_JOBS 에 "이름:주기(분)" 로 지정 (예: asap:30,taobao:360)
+#   이름은 jobs.JOBS 참고
+# - 모듈이 계속 떠 있으므로 HTTP 커넥션 풀 / ASAP 로그인 세션 / 상태 DB 를 실행 간 재사용
+# - /status: 작업별 마지막 실행, /metrics: Prometheus 지표 (metrics.py)
+# - SIGTERM / SIGINT → 새 작업 중단, 실행 중인 작업을 DAEMON_SHUTDOWN_TIMEOUT 초까지 기다린 뒤
+#   Notion 쓰기 큐 / 알림 큐 비우고 상태 DB 저장 후 종료
+# - 알림(재입고 / 통관 완료)은 notifier 가 NOTIFY_DIGEST_SECONDS 동안 모아 작업과 상관없이 메일 한 통으로
+# ─────────────────────────────────────────────────────────────
 
 app = Flask(__name__)
 
+# 건별 조회 시각은 스케줄러가 정하고, 여기서는 짧은 주기로 깨워주기만 함
+POLL_TICK_SECONDS = int(os.getenv("POLL_TICK_SECONDS") or 60)
+DAEMON_JOBS = os.getenv("DAEMON_JOBS") or "asap:30"
+SHUTDOWN_TIMEOUT = float(os.getenv("DAEMON_SHUTDOWN_TIMEOUT") or 120)
+
+scheduler = PollScheduler()
+runner = JobRunner()
+stopping = threading.Event()
+
+
+def parse_jobs(spec):
+    """ "asap:30,taobao:360" → [("asap", 30.0), ("taobao", 360.0)] """
+    jobs = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, minutes = part.partition(":")
+        if name not in JOBS:
+            print(f"[⚠️ 알 수 없는 작업 → 건너뜀] {name}")
+            continue
+        jobs.append((name, float(minutes or 60)))
+    return jobs
+
+
+def trigger(name, fn=None):
+    if stopping.is_set():
+        return
+    if not runner.start(name, fn):
+        print(f"[⏭️ {name} 이미 실행 중 → 이번 차례 건너뜀]")
+
+
 @app.route("/")
 def home():
     return "Tracking server running!"
 
+
+@app.route("/status")
+def status():
+    return jsonify(runner.status())
+
+
+@app.route("/metrics")
+def metrics():
+    return Response(prometheus_text(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 def run_scheduler():
-    schedule.every().day.at("09:00").do(main)  # 매일 오전 9시 실행
+    schedule.every(POLL_TICK_SECONDS).seconds.do(trigger, "poll", scheduler.tick)
+    for name, minutes in parse_jobs(DAEMON_JOBS):
+        print(f"[🗓️ 작업 등록] {name} — {minutes:g}분마다")
+        schedule.every(minutes).minutes.do(trigger, name)
 
-    while True:
+    while not stopping.is_set():
         schedule.run_pending()
         time.sleep(1)
 
+
+def shutdown(signum, frame):
+    if stopping.is_set():
+        return
+    print(f"\n[🛑 종료 신호 {signum}] 실행 중인 작업 마무리 후 종료")
+    stopping.set()
+
+    if not runner.wait(SHUTDOWN_TIMEOUT):
+        print(f"[⚠️ {SHUTDOWN_TIMEOUT:g}초 안에 끝나지 않은 작업] {', '.join(runner.status()['running'])}")
+
+    flush_and_report()
+    flush_notifications()
+    get_store().commit()
+    print("[👋 종료]")
+    sys.exit(0)
+
+
 if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
     t = threading.Thread(target=run_scheduler)
     t.daemon = True
     t.start()
@@ -1,9 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
 import os
+import queue
+import threading
 import time
 from datetime import datetime, timedelta
 
+import http_client
+from html_parsing import parse_orders
+from jobs import progress, set_progress
+from metrics import dump_summary, record_run
+from notion_writer import get_writer, flush_and_report
+from order_index import get_index
+from state_store import get_store
+
 ASAP_LOGIN_URL = "https://asap-china.com/elpisbbs/login.php"
 ASAP_AJAX_URL = "https://asap-china.com/elpisbbs/ajax.nt_order_list_member.php"
 
@@ -13,6 +21,16 @@ ASAP_PW = os.getenv("ASAP_PW")
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 
+# 📌 로컬 체크포인트 (마지막으로 저장한 주문: 송장번호 + 링크 + 주문일, state.db)
+CHECKPOINT_NAME = "asap"
+SYNC_MARGIN_DAYS = int(os.getenv("ASAP_SYNC_MARGIN_DAYS") or 3)   # 조회 시작일 여유
+FULL_SYNC = os.getenv("ASAP_FULL_SYNC") == "1"                     # 체크포인트 무시
+
+PREFETCH_PAGES = 2   # 저장이 밀려 있을 때 미리 받아둘 주문 목록 페이지 수
+
+# 상주 실행(app.py) 시 로그인 세션 재사용 시간 (분)
+SESSION_TTL = float(os.getenv("ASAP_SESSION_TTL_MINUTES") or 30) * 60
+
 NOTION_HEADERS = {
     "Authorization": f"Bearer {NOTION_TOKEN}",
     "Notion-Version": "2022-06-28",
@@ -42,7 +60,7 @@ def get_last_link_from_notion():
         ]
     }
 
-    res = requests.post(url, headers=NOTION_HEADERS, json=payload)
+    res = http_client.post(url, headers=NOTION_HEADERS, json=payload, idempotent=True)
 
     print("🔎 노션 API 응답코드:", res.status_code)
 
@@ -72,13 +90,38 @@ def get_last_link_from_notion():
     return None
 
 
+# ==================================================
+# 📌 로컬 체크포인트 (state.db checkpoints 테이블)
+# ==================================================
+
+def load_checkpoint():
+
+    return get_store().get_checkpoint(CHECKPOINT_NAME) or {}
+
+
+def save_checkpoint(order):
+
+    data = {
+        "last_invoice": order["invoice"],
+        "last_link": order["link"],
+        "last_date": order.get("date"),
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+    store = get_store()
+    store.set_checkpoint(CHECKPOINT_NAME, data)
+    store.commit()
+
+    print("💾 체크포인트 저장:", data["last_invoice"], data["last_date"])
+
+
 # ==================================================
 # 🔐 로그인
 # ==================================================
 
 def login():
 
-    session = requests.Session()
+    session = http_client.new_session()
 
     headers = {
         "User-Agent": "Mozilla/5.0",
@@ -90,7 +133,7 @@ def login():
         "mb_password": ASAP_PW,
     }
 
-    res = session.post(ASAP_LOGIN_URL, data=payload, headers=headers)
+    res = http_client.post(ASAP_LOGIN_URL, session=session, data=payload, headers=headers)
 
     print("🔐 로그인 응답코드:", res.status_code)
 
@@ -100,227 +143,338 @@ def login():
     return session
 
 
-# ==================================================
-# 🔥 HTML 파싱
-# ==================================================
-
-def parse_orders(html):
-
-    soup = BeautifulSoup(html, "html.parser")
-    orders = []
-
-    for a in soup.find_all("a", href=True):
+_session = None
+_session_at = 0.0
+_session_lock = threading.Lock()
 
-        invoice = a.get_text(strip=True)
 
-        if not invoice.isdigit():
-            continue
-
-        link = a["href"]
+def get_session():
+    """
+    로그인 세션 (상주 실행 중이면 SESSION_TTL 동안 재사용)
+    새로 로그인했을 때만 마이페이지를 한 번 열어 둠
+    """
+    global _session, _session_at
 
-        if link.startswith("http"):
-            full_link = link
+    with _session_lock:
+        if _session is None or time.time() - _session_at >= SESSION_TTL:
+            _session = login()
+            _session_at = time.time()
+            if _session:
+                http_client.get("https://asap-china.com/mypage/service_list.php", session=_session)
         else:
-            full_link = "https://www.asap-china.com" + link
+            print("🔐 로그인 세션 재사용")
+        return _session
 
-        name = ""
 
-        current_tr = a.find_parent("tr")
+def drop_session():
+    """로그인이 풀린 것 같으면 다음 실행에서 다시 로그인"""
+    global _session
+    with _session_lock:
+        _session = None
 
-        if current_tr:
-            next_tr = current_tr.find_next_sibling("tr")
 
-            if next_tr:
-                p_tags = next_tr.find_all("p")
+# ==================================================
+# 🔥 노션 저장 (SortKey 추가!!)
+# ==================================================
+
+def add_to_notion(link, receiver, on_success=None, on_failure=None):
+    """on_success / on_failure: 저장 결과가 나오면 노션 쓰기 스레드에서 호출 (실행별 집계용)"""
 
-                if len(p_tags) >= 2:
-                    name = p_tags[1].get_text(strip=True)
-                elif len(p_tags) == 1:
-                    name = p_tags[0].get_text(strip=True)
+    if not NOTION_DATABASE_ID:
+        print("❌ 노션 DB ID 없음")
+        return False
+
+    # ✅ 이미 저장했거나 저장 중인 주문이면 건너뜀 (링크/송장번호 색인)
+    index = get_index()
+    if not index.reserve(link):
+        print("⏭️ 이미 저장된 주문:", link)
+        return False
+
+    sort_key = time.time()  # ✅ 자동 증가 키 (큐에 넣은 순서대로 증가)
+
+    properties = {
+        "조회링크": {
+            "url": link
+        },
+        "성함": {
+            "rich_text": [
+                {"text": {"content": receiver}}
+            ]
+        },
+        "SortKey": {   # ✅ 새로 추가된 필드
+            "number": sort_key
+        }
+    }
 
-        if "배송" in name:
-            name = ""
+    # 쓰기 큐에 넣고 바로 다음 주문으로 (전송은 백그라운드, 넣은 순서 유지)
+    # 저장에 성공해야 색인에 추가 (실패하면 다음 실행에서 다시 시도)
+    def confirm():
+        index.confirm(link)
+        if on_success:
+            on_success()
 
-        orders.append({
-            "invoice": invoice,
-            "link": full_link,
-            "name": name
-        })
+    def release():
+        index.release(link)
+        if on_failure:
+            on_failure()
 
-    return orders
+    get_writer().create_page(NOTION_DATABASE_ID, properties, on_success=confirm, on_failure=release)
+    return True
 
 
 # ==================================================
-# 🔥 노션 저장 (SortKey 추가!!)
+# 🔥 주문 목록 페이지 수집 (파이프라인 1단계)
 # ==================================================
 
-def add_to_notion(link, receiver):
-
-    if not NOTION_DATABASE_ID:
-        print("❌ 노션 DB ID 없음")
-        return
+def fetch_order_pages(session, sdate, edate, pages, stop, result):
+    """
+    AJAX 주문 목록을 넘겨가며 파싱한 주문 리스트를 pages 큐에 넣음
+    - 소비 쪽(메인)이 노션 저장 큐를 채우는 동안 다음 페이지를 미리 받아둠
+    - stop 이 설정되면(기준 주문 발견) 중단, 끝나면 None 을 넣어 종료 알림
+    - 오류로 중간에 멈췄으면 result["error"] 에 이유 (목록 끝까지 받았으면 None)
+    """
 
-    url = "https://api.notion.com/v1/pages"
+    offset = 0
+    limit = 20
 
-    sort_key = time.time()  # ✅ 자동 증가 키
+    try:
+        while not stop.is_set():
+
+            params = {
+                "last": offset,
+                "limit": limit,
+                "find": "",
+                "value": "",
+                "or_de_no": "",
+                "state": "",
+                "sdate": sdate,
+                "edate": edate,
+                "mb_id": ASAP_ID,
+                "type": "",
+                "last_code": "",
+                "it_code": "",
+                "dtype": "",
+                "gr_output_stay_type": "",
+                "gr_var5": "",
+                "gr_unipass_result": "",
+                "gr_fltno": "",
+                "gr_fltno2": "",
+            }
 
-    payload = {
-        "parent": {"database_id": NOTION_DATABASE_ID},
-        "properties": {
-            "조회링크": {
-                "url": link
-            },
-            "성함": {
-                "rich_text": [
-                    {"text": {"content": receiver}}
-                ]
-            },
-            "SortKey": {   # ✅ 새로 추가된 필드
-                "number": sort_key
+            headers = {
+                "User-Agent": "Mozilla/5.0",
+                "X-Requested-With": "XMLHttpRequest",
+                "Referer": "https://asap-china.com/mypage/service_list.php",
+                "Origin": "https://asap-china.com"
             }
-        }
-    }
 
-    res = requests.post(url, headers=NOTION_HEADERS, json=payload)
+            res = http_client.post(
+                ASAP_AJAX_URL,
+                session=session,
+                headers=headers,
+                params=params,
+                idempotent=True,
+            )
+
+            print("AJAX 응답 상태코드:", res.status_code)
+            print("AJAX 응답 길이:", len(res.text))
+
+            # 재사용한 세션이 만료돼 로그인 페이지로 넘어간 경우
+            if "login.php" in res.url:
+                print("🔐 로그인 만료 → 다음 실행에서 다시 로그인")
+                drop_session()
+                result["error"] = "로그인 만료"
+                break
 
-    if res.status_code != 200:
-        print("❌ 노션 저장 실패:", res.text)
+            '''#디버깅
+            html = res.text
 
+            print("\n============================")
+            print("🔍 HTML 일부 출력 (앞 2000자)")
+            print("============================\n")
+            print(html[:2000])
 
-# ==================================================
-# 🔥 메인
-# ==================================================
+            orders = parse_orders(html)
 
-def main():
+            print("\n============================")
+            print("📦 첫 페이지 주문 링크 목록")
+            print("============================\n")
 
-    last_link = get_last_link_from_notion()
-    print("📌 노션 기준 링크:", last_link)
+            for i, o in enumerate(orders):
+                print(f"{i+1}. {o['link']}")
 
-    session = login()
-    if not session:
-        return
+            print("\n============================")
+            print("🎯 기준 링크 위치 확인")
+            print("============================\n")
+    
+            if last_link:
+                for i, o in enumerate(orders):
+                    if o["link"] == last_link:
+                        print(f"⚠ 기준 링크가 {i+1}번째에 있음")
+                        break
+                else:
+                    print("❌ 기준 링크가 이 페이지에 없음")
+    
+            print("\n✅ 디버깅 완료")
 
-    session.get("https://asap-china.com/mypage/service_list.php")
-    time.sleep(1)
+            #끝'''
 
-    offset = 0
-    limit = 20
+            if res.status_code != 200:
+                result["error"] = f"HTTP {res.status_code}"
+                break
 
-    today = datetime.today()
-    #sdate = (today - timedelta(days=10)).strftime("%Y-%m-%d")
-    #edate = today.strftime("%Y-%m-%d")
-    sdate = "2000-01-01"
-    edate = "2099-12-31"
+            html = res.text
 
-    while True:
+            if not html.strip():
+                break
 
-        params = {
-            "last": offset,
-            "limit": limit,
-            "find": "",
-            "value": "",
-            "or_de_no": "",
-            "state": "",
-            "sdate": sdate,
-            "edate": edate,
-            "mb_id": ASAP_ID,
-            "type": "",
-            "last_code": "",
-            "it_code": "",
-            "dtype": "",
-            "gr_output_stay_type": "",
-            "gr_var5": "",
-            "gr_unipass_result": "",
-            "gr_fltno": "",
-            "gr_fltno2": "",
-        }
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0",
-            "X-Requested-With": "XMLHttpRequest",
-            "Referer": "https://asap-china.com/mypage/service_list.php",
-            "Origin": "https://asap-china.com"
-        }
+            orders = parse_orders(html)
+            if not orders:
+                break
+
+            pages.put(orders)
+
+            offset += limit
 
-        res = session.post(
-            ASAP_AJAX_URL,
-            headers=headers,
-            params=params
-        )
+    except Exception as e:
+        print("❌ 주문 목록 수집 실패:", e)
+        result["error"] = str(e)
 
-        print("AJAX 응답 상태코드:", res.status_code)
-        print("AJAX 응답 길이:", len(res.text))
+    finally:
+        pages.put(None)
 
-        '''#디버깅
-        html = res.text
 
-        print("\n============================")
-        print("🔍 HTML 일부 출력 (앞 2000자)")
-        print("============================\n")
-        print(html[:2000])
+# ==================================================
+# 🔥 메인
+# ==================================================
+
+def main():
 
-        orders = parse_orders(html)
+    started = time.perf_counter()
+    checkpoint = {} if FULL_SYNC else load_checkpoint()
 
-        print("\n============================")
-        print("📦 첫 페이지 주문 링크 목록")
-        print("============================\n")
+    last_link = checkpoint.get("last_link")
+    last_invoice = checkpoint.get("last_invoice")
+    last_date = checkpoint.get("last_date")
 
-        for i, o in enumerate(orders):
-            print(f"{i+1}. {o['link']}")
+    if last_link or last_invoice:
+        print("📌 로컬 체크포인트:", last_invoice, last_date, last_link)
+    else:
+        # 체크포인트가 없을 때만 노션에서 복구
+        last_link = get_last_link_from_notion()
+        print("📌 노션 기준 링크:", last_link)
 
-        print("\n============================")
-        print("🎯 기준 링크 위치 확인")
-        print("============================\n")
-    
-        if last_link:
-            for i, o in enumerate(orders):
-                if o["link"] == last_link:
-                    print(f"⚠ 기준 링크가 {i+1}번째에 있음")
-                    break
-            else:
-                print("❌ 기준 링크가 이 페이지에 없음")
-    
-        print("\n✅ 디버깅 완료")
+    def is_checkpoint(order):
+        return (last_link and order["link"] == last_link) or \
+               (last_invoice and order["invoice"] == last_invoice)
 
-        #끝'''
+    session = get_session()
+    if not session:
+        return
 
-        if res.status_code != 200:
-            break
+    today = datetime.today()
+    #sdate = (today - timedelta(days=10)).strftime("%Y-%m-%d")
+    #edate = today.strftime("%Y-%m-%d")
+    sdate = "2000-01-01"
+    edate = "2099-12-31"
 
-        html = res.text
+    # 체크포인트 주문일 기준으로 조회 구간 제한 (여유 SYNC_MARGIN_DAYS 일)
+    if last_date:
+        start = datetime.strptime(last_date, "%Y-%m-%d") - timedelta(days=SYNC_MARGIN_DAYS)
+        sdate = start.strftime("%Y-%m-%d")
+        print("📅 조회 시작일:", sdate)
+
+    newest = None    # 이번 실행에서 가장 최근 주문 → 새 체크포인트
+    matched = None   # 목록에서 찾은 기존 기준 주문
+    reached = False  # 기존 기준 주문(또는 그 이전 주문)까지 도달
+
+    # 이번 실행의 저장 결과 (노션 쓰기 큐 전체 통계는 상주 실행 중 다른 작업이 초기화할 수 있음)
+    saved = {"created": 0, "failed": 0}
+
+    def count_created():
+        saved["created"] += 1
+
+    def count_failed():
+        saved["failed"] += 1
+
+    # 수집(1단계)은 별도 스레드, 저장(2단계)은 노션 쓰기 큐 → 두 단계가 겹쳐서 진행
+    pages = queue.Queue(maxsize=PREFETCH_PAGES)
+    stop = threading.Event()
+    fetched = {"error": None}
+    fetcher = threading.Thread(
+        target=fetch_order_pages,
+        args=(session, sdate, edate, pages, stop, fetched),
+        name="asap-fetch",
+        daemon=True,
+    )
+    fetcher.start()
 
-        if not html.strip():
-            break
+    while True:
 
-        orders = parse_orders(html)
-        if not orders:
+        orders = pages.get()
+        if orders is None:
             break
+        progress("pages")
 
         valid_orders = []
 
         for order in orders:
 
-            link = order["link"]
-
-            if last_link and link == last_link:
+            if is_checkpoint(order):
                 print("🛑 기준 링크 발견 -> 중단")
+                matched = order
+                reached = True
+                break
+
+            # 목록은 최신순 → 기준 주문일보다 이전 주문이 나오면 그 뒤는 모두 저장된 주문
+            if last_date and order.get("date") and order["date"] < last_date:
+                print("🛑 기준 주문일 이전 주문 -> 중단")
+                reached = True
                 break
 
             valid_orders.append(order)
 
+        if newest is None and valid_orders:
+            newest = valid_orders[0]
+
         valid_orders.reverse()
 
+        # 저장 순서는 기존과 동일 (페이지 단위로 오래된 주문부터) → SortKey 순서 유지
         for order in valid_orders:
-            print("➕ 저장:", order["invoice"], order["name"])
-            add_to_notion(order["link"], order["name"])
+            if add_to_notion(order["link"], order["name"], on_success=count_created, on_failure=count_failed):
+                print("➕ 저장:", order["invoice"], order["name"])
+                progress("queued")
+            else:
+                progress("skipped")
 
-        if last_link and any(o["link"] == last_link for o in orders):
+        if reached:
+            stop.set()
             break
 
-        offset += limit
+    # 미리 받아둔 페이지가 있으면 비워서 수집 스레드가 막히지 않게
+    while fetcher.is_alive():
+        try:
+            pages.get(timeout=0.1)
+        except queue.Empty:
+            pass
+
+    flush_and_report()
+    get_index().save()
+    set_progress(saved=saved["created"], failed=saved["failed"])
+    record_run("asap", saved["created"], time.perf_counter() - started)
+
+    # 노션 저장이 전부 성공했을 때만 체크포인트 전진 (실패분은 다음 실행에서 다시)
+    # 목록을 오류로 중간에 못 받았으면 그 뒤 주문이 빠졌을 수 있으니 전진하지 않음
+    if saved["failed"]:
+        print(f"⚠ 노션 저장 실패 {saved['failed']}건이 있어 체크포인트를 유지합니다")
+    elif not reached and fetched["error"]:
+        print(f"⚠ 주문 목록 수집이 중단되어({fetched['error']}) 체크포인트를 유지합니다")
+    elif newest or matched:
+        save_checkpoint(newest or matched)
 
     print("✅ 실행 완료")
 
 
 if __name__ == "__main__":
     main()
+    dump_summary()
@@ -0,0 +1,179 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+# ─────────────────────────────────────────────────────────────
+# 오프라인 벤치마크 (네트워크 없이 bench/fixtures + 로컬 스텁 서버만 사용)
+#
+#   1. 파싱 시간  : 파서별 1회 평균(ms), 기존 파서 대비 배속, 결과 동일 여부
+#   2. 처리량     : ASAP / Tradlinx / 타오바오 조회 requests/sec
+#   3. 전체 실행  : unipass_sync.main() — N건 (두 DB 조회 → 통관 조회 → Notion 쓰기)
+#                   호스트별 지연 / 파서 시간은 metrics 요약으로 같이 저장
+#
+# 실행:
+#   python bench/run_bench.py --shipments 200 --latency 30 --rate-429 0.02
+#   python bench/run_bench.py --json bench_output.txt
+# ─────────────────────────────────────────────────────────────
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+# 모듈 import 전에 설정해야 하는 값 (벤치용 DB / 임시 캐시 / 캐시 무시)
+os.environ.setdefault("NOTION_TOKEN", "bench-token")
+os.environ.setdefault("NOTION_DATABASE_ID", "bench-invoice-db")
+os.environ.setdefault("LEDGER_DB_ID", "bench-ledger-db")
+os.environ.setdefault("STATE_DB_FILE", os.path.join(tempfile.mkdtemp(), "state.db"))
+os.environ.setdefault("UNIPASS_FORCE", "1")
+os.environ.setdefault("HTTP_MAX_RETRIES", "5")
+# 타오바오 요청 간격 조절은 빼고 코드 처리량만 측정 (차단 대응은 TAOBAO_MIN_INTERVAL 로 따로 확인)
+os.environ.setdefault("TAOBAO_MIN_INTERVAL", "0")
+
+from stub_server import StubServer, load_fixture, invoice_for, bl_for  # noqa: E402
+
+import http_client  # noqa: E402
+import metrics  # noqa: E402
+import html_parsing  # noqa: E402
+from check_pool import run_checks  # noqa: E402
+
+PARSE_CASES = [
+    ("asap", "asap_unipass.html"),
+    ("asap", "asap_unipass_empty.html"),
+    ("tradlinx", "tradlinx_unipass.html"),
+    ("tradlinx", "tradlinx_not_found.html"),
+    ("orders", "asap_orders.html"),
+    ("taobao", "taobao_item_instock.html"),
+    ("taobao", "taobao_block.html"),
+]
+
+
+def timed(fn, repeat):
+    fn()  # 워밍업
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+@contextlib.contextmanager
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_parsing(repeat):
+    rows = []
+    for kind, name in PARSE_CASES:
+        html = load_fixture(name)
+        fast, legacy = html_parsing.PARSERS[kind]
+        t_fast = timed(lambda: fast(html), repeat)
+        t_legacy = timed(lambda: legacy(html), repeat)
+        rows.append({
+            "parser": kind,
+            "fixture": name,
+            "fast_ms": t_fast * 1000,
+            "legacy_ms": t_legacy * 1000,
+            "speedup": t_legacy / t_fast if t_fast else 0,
+            "equivalent": fast(html) == legacy(html),
+        })
+    return rows
+
+
+def bench_throughput(n, workers):
+    import unipass_check
+    import taobao_alert
+
+    cases = {
+        "asap": (
+            [{"type": "asap", "code": f"GR{i:013d}", "invoice": invoice_for(i)} for i in range(n)],
+            unipass_check.check_item,
+        ),
+        "tradlinx": (
+            [{"type": "tradlinx", "bl_no": bl_for(i)} for i in range(n)],
+            unipass_check.check_item,
+        ),
+        "taobao": (
+            [{"type": "taobao", "url": f"https://item.taobao.com/item.htm?id={968090853111 + i}"} for i in range(n)],
+            lambda it: taobao_alert.is_restocked(it["url"]),
+        ),
+    }
+
+    rows = []
+    for name, (items, check) in cases.items():
+        start = time.perf_counter()
+        with quiet():
+            done = sum(1 for _ in run_checks(items, check, workers=workers))
+        elapsed = time.perf_counter() - start
+        rows.append({"target": name, "checks": done, "seconds": elapsed, "checks_per_sec": done / elapsed})
+    return rows
+
+
+def bench_end_to_end(workers):
+    import unipass_sync
+
+    start = time.perf_counter()
+    with quiet():
+        unipass_sync.main(workers=workers)
+    return time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description="오프라인 벤치마크")
+    ap.add_argument("--shipments", type=int, default=200, help="전체 실행 배송 건수")
+    ap.add_argument("--checks", type=int, default=100, help="처리량 측정 조회 건수")
+    ap.add_argument("--latency", type=float, default=30, help="스텁 서버 지연 (ms)")
+    ap.add_argument("--rate-429", type=float, default=0.0, help="스텁 서버 429 비율")
+    ap.add_argument("--workers", type=int, default=None, help="동시 조회 워커 수")
+    ap.add_argument("--repeat", type=int, default=20, help="파싱 반복 횟수")
+    ap.add_argument("--json", help="결과를 JSON 으로 저장할 경로")
+    args = ap.parse_args()
+
+    results = {"parser_backend": html_parsing.PARSER}
+
+    print(f"[🧪 파싱] backend={html_parsing.PARSER}, {args.repeat}회 평균")
+    results["parsing"] = bench_parsing(args.repeat)
+    for r in results["parsing"]:
+        mark = "✅" if r["equivalent"] else "❌"
+        print(
+            f"  {mark} {r['parser']:<9} {r['fixture']:<28} "
+            f"{r['fast_ms']:7.2f}ms  (기존 {r['legacy_ms']:7.2f}ms, x{r['speedup']:.1f})"
+        )
+
+    with StubServer(latency=args.latency / 1000, rate_429=args.rate_429, shipments=args.shipments) as stub:
+        http_client.set_host_overrides(stub.overrides())
+
+        print(f"\n[🧪 처리량] {args.checks}건, 지연 {args.latency:.0f}ms, 429 비율 {args.rate_429}")
+        results["throughput"] = bench_throughput(args.checks, args.workers)
+        for r in results["throughput"]:
+            print(f"  {r['target']:<9} {r['checks_per_sec']:7.1f} 건/s  ({r['seconds']:.2f}s)")
+
+        print(f"\n[🧪 전체 실행] unipass_sync.main() {args.shipments}건 × 2 DB")
+        stub.state.counts.clear()
+        metrics.registry.reset()
+        elapsed = bench_end_to_end(args.workers)
+        results["end_to_end"] = {
+            "shipments": args.shipments,
+            "seconds": elapsed,
+            "stub_requests": dict(stub.state.counts),
+            "metrics": metrics.registry.summary(),
+        }
+        print(f"  {elapsed:.2f}s  ({args.shipments / elapsed:.1f} 건/s)")
+        print(f"  스텁 요청 수: {sum(v for k, v in stub.state.counts.items() if k != '429')} (429: {stub.state.counts.get('429', 0)})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n[💾 저장] {args.json}")
+
+    if not all(r["equivalent"] for r in results["parsing"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
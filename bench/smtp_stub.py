@@ -0,0 +1,114 @@
+import argparse
+import socketserver
+import threading
+from email import message_from_bytes, policy
+
+# ─────────────────────────────────────────────────────────────
+# 로컬 SMTP 스텁 — notifier.py 를 실제 메일 없이 확인할 때 사용
+#
+# 받은 메일은 messages 에 쌓고 (연결 수 / 로그인 수도 기록) 실제로 보내지 않음
+#   with SmtpStub() as smtp:
+#       os.environ["SMTP_HOST"], os.environ["SMTP_PORT"] = "127.0.0.1", str(smtp.port)
+#       ...
+#       smtp.messages  → [EmailMessage, ...]
+#
+# 단독 실행 (받은 메일 제목 출력):
+#   python bench/smtp_stub.py --port 1025
+#   SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_SSL=0 python taobao_alert.py
+# ─────────────────────────────────────────────────────────────
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    stub = None   # SmtpStub (서버마다 서브클래스로 지정)
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.stub.count("connections")
+        self.reply("220 smtp-stub ready")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            cmd = raw.decode(errors="replace").strip()
+            verb = cmd.split(" ", 1)[0].upper()
+
+            if verb == "EHLO":
+                self.reply("250-smtp-stub")
+                self.reply("250 AUTH LOGIN PLAIN")
+            elif verb == "HELO":
+                self.reply("250 smtp-stub")
+            elif verb == "AUTH":
+                self.stub.count("logins")
+                self.reply("235 ok")
+            elif verb == "DATA":
+                self.reply("354 end with .")
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if line in (b".\r\n", b".\n", b""):
+                        break
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                self.stub.receive(b"".join(lines))
+                self.reply("250 queued")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 ok")
+            else:
+                self.reply("502 not implemented")
+
+
+class SmtpStub:
+    def __init__(self, host="127.0.0.1", port=0, verbose=False):
+        self.messages = []
+        self.counts = {}
+        self.verbose = verbose
+        self.lock = threading.Lock()
+
+        handler = type("BoundSmtpHandler", (SmtpHandler,), {"stub": self})
+        self.server = socketserver.ThreadingTCPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address[:2]
+        self.thread = None
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def receive(self, data):
+        msg = message_from_bytes(data, policy=policy.default)
+        with self.lock:
+            self.messages.append(msg)
+        if self.verbose:
+            print(f"[📨 받음] {msg['Subject']}\n{msg.get_content()}")
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="로컬 SMTP 스텁")
+    ap.add_argument("--port", type=int, default=1025)
+    args = ap.parse_args()
+
+    stub = SmtpStub(port=args.port, verbose=True)
+    print(f"[🧪 SMTP 스텁] {stub.host}:{stub.port} (SMTP_SSL=0)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
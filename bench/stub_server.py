@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# ─────────────────────────────────────────────────────────────
+# 로컬 스텁 서버 — asap-china.com / tradlinx.com / taobao / api.notion.com 대역
+# bench/fixtures 의 녹화 페이지를 돌려줌 (지연 시간, 429 비율 조절 가능)
+#
+# 스크립트를 여기로 돌리려면 http_client 호스트 오버라이드 사용:
+#   HTTP_HOST_OVERRIDES="asap-china.com=http://127.0.0.1:8765,..."  (StubServer.overrides())
+#
+# 단독 실행:
+#   python bench/stub_server.py --port 8765 --latency 50 --rate-429 0.05
+# ─────────────────────────────────────────────────────────────
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+STUB_HOSTS = [
+    "asap-china.com",
+    "www.asap-china.com",
+    "www.tradlinx.com",
+    "item.taobao.com",
+    "api.notion.com",
+]
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def invoice_for(i):
+    return str(500219000000 + i)
+
+
+def bl_for(i):
+    return str(6012340000000 + i)
+
+
+class StubState:
+    def __init__(self, latency=0.0, rate_429=0.0, retry_after=0, shipments=100,
+                 cleared_every=10, order_pages=3, seed=0):
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.shipments = shipments
+        self.cleared_every = cleared_every
+        self.order_pages = order_pages
+        self.random = random.Random(seed)
+
+        self.fixtures = {name: load_fixture(name) for name in os.listdir(FIXTURE_DIR)}
+        self.page_template = json.loads(self.fixtures["notion_query.json"])["results"][0]
+
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def should_throttle(self):
+        with self.lock:
+            return self.rate_429 > 0 and self.random.random() < self.rate_429
+
+    # ── Notion DB 조회 결과 생성 ──
+    def notion_page(self, i):
+        page = json.loads(json.dumps(self.page_template))
+        page["id"] = f"00000000-0000-4000-8000-{i:012d}"
+        # 4건 중 1건은 Tradlinx BL 번호, 나머지는 ASAP 링크
+        if i % 4 == 3:
+            raw = bl_for(i)
+        else:
+            raw = f"https://asap-china.com/guide/unipass_delivery.php?code=GR{i:013d}&invoice={invoice_for(i)}"
+        props = page["properties"]
+        props["조회링크"]["url"] = raw
+        props["성함"]["rich_text"][0]["plain_text"] = f"수취인{i}"
+        # 장부 DB 속성 이름으로도 같은 값 (두 DB 가 같은 송장을 가진 상황 재현)
+        props["배송조회링크"] = {"id": "Vv%3Ff", "type": "url", "url": raw}
+        props["이름"] = {"id": "title", "type": "title", "title": [{"plain_text": f"수취인{i}"}]}
+        # 타오바오 상품 DB 속성 (같은 행을 상품 목록으로도 사용)
+        props["상품 링크"] = {"id": "title", "type": "title",
+                          "title": [{"plain_text": f"https://item.taobao.com/item.htm?id={968090853111 + i}"}]}
+        return page
+
+    def notion_query(self, body):
+        size = int(body.get("page_size") or 100)
+        start = int(body.get("start_cursor") or 0)
+        end = min(self.shipments, start + size)
+        more = end < self.shipments
+        return {
+            "object": "list",
+            "results": [self.notion_page(i) for i in range(start, end)],
+            "has_more": more,
+            "next_cursor": str(end) if more else None,
+        }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None   # StubState (서버마다 서브클래스로 지정)
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body="", content_type="text/html; charset=utf-8", headers=None):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, obj, status=200):
+        self._send(status, json.dumps(obj, ensure_ascii=False), "application/json")
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw or b"{}")
+        except ValueError:
+            return {}
+
+    def _handle(self, method):
+        st = self.state
+        url = urlparse(self.path)
+        qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body = self._body() if method in ("POST", "PATCH") else {}
+
+        if st.latency:
+            time.sleep(st.latency)
+
+        st.count(f"{method} {url.path}")
+
+        if st.should_throttle():
+            st.count("429")
+            return self._send(429, "rate limited", headers={"Retry-After": str(st.retry_after)})
+
+        f = st.fixtures
+        path = url.path
+
+        # ASAP 유니패스 조회
+        if path == "/guide/unipass_delivery.php":
+            n = int(qs.get("invoice", "0") or 0)
+            if n % st.cleared_every == 0:
+                return self._send(200, f["asap_unipass.html"])
+            if n % st.cleared_every == 1:
+                return self._send(200, f["asap_unipass_empty.html"])
+            return self._send(200, f["asap_unipass_pending.html"])
+
+        # Tradlinx: 홀수 BL 은 작년 BL (올해로 조회하면 없음)
+        if path == "/ko/unipass":
+            bl = int(qs.get("blNo", "0") or 0)
+            year = int(qs.get("blYr", "0") or 0)
+            if bl % 2 and year == datetime.now().year:
+                return self._send(200, f["tradlinx_not_found.html"])
+            return self._send(200, f["tradlinx_unipass.html"])
+
+        # ASAP 로그인 / 주문 목록
+        if path in ("/elpisbbs/login.php", "/mypage/service_list.php"):
+            return self._send(200, "<html><body>ok</body></html>")
+        if path == "/elpisbbs/ajax.nt_order_list_member.php":
+            last = int(qs.get("last", "0") or 0)
+            limit = int(qs.get("limit", "20") or 20)
+            if last >= st.order_pages * limit:
+                return self._send(200, "")
+            return self._send(200, f["asap_orders.html"])
+
+        # 타오바오 상품: id 끝자리 0 → 차단, 홀수 → 품절, 짝수 → 재고 있음
+        # 상품 페이지는 ETag 를 주고, If-None-Match 가 같으면 304
+        if path == "/item.htm":
+            item_id = qs.get("id", "0")
+            if item_id.endswith("0"):
+                return self._send(200, f["taobao_block.html"])
+            name = "taobao_item_soldout.html" if int(item_id[-1]) % 2 else "taobao_item_instock.html"
+            etag = f'"{name}-{item_id}"'
+            if self.headers.get("If-None-Match") == etag:
+                st.count("304")
+                return self._send(304, "", headers={"ETag": etag})
+            return self._send(200, f[name], headers={"ETag": etag})
+
+        # Notion
+        if path.startswith("/v1/databases/") and path.endswith("/query"):
+            return self._json(st.notion_query(body))
+        if path.startswith("/v1/databases/"):
+            return self._json(json.loads(f["notion_database.json"]))
+        if path.startswith("/v1/pages"):
+            return self._json({"object": "page", "id": path.rsplit("/", 1)[-1]})
+
+        self._send(404, "not found")
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+
+class StubServer:
+    def __init__(self, host="127.0.0.1", port=0, **state_kwargs):
+        self.state = StubState(**state_kwargs)
+        handler = type("BoundStubHandler", (StubHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def overrides(self):
+        """http_client.set_host_overrides() 에 넘길 값"""
+        return {h: self.base_url for h in STUB_HOSTS}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="로컬 스텁 서버")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0, help="요청당 지연 (ms)")
+    ap.add_argument("--rate-429", type=float, default=0, help="429 응답 비율 (0~1)")
+    ap.add_argument("--retry-after", type=int, default=0)
+    ap.add_argument("--shipments", type=int, default=100, help="Notion DB 가상 배송 건수")
+    args = ap.parse_args()
+
+    server = StubServer(
+        port=args.port,
+        latency=args.latency / 1000,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        shipments=args.shipments,
+    )
+    overrides = ",".join(f"{h}={server.base_url}" for h in STUB_HOSTS)
+    print(f"[🧪 스텁 서버] {server.base_url}")
+    print(f'HTTP_HOST_OVERRIDES="{overrides}"')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,203 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+
+from check_pool import DEFAULT_WORKERS, run_checks
+from metrics import dump_summary, record_run
+from unipass_check import CLEARED_STEP, check_item, is_probably_number, latest_step
+
+# ─────────────────────────────────────────────────────────────
+# 대량 통관 조회 (Notion 없이 파일 → JSONL)
+#
+# 입력: CSV / TXT 한 줄에 한 건 (tracking_list.txt 형식), 한 줄씩 읽으며 바로 조회
+#   GR2503272000835,500219005334            ASAP (통관고유부호, 송장번호)
+#   https://asap-china.com/...?code=..&invoice=..  ASAP 조회 링크
+#   601234567890                             Tradlinx (BL 번호)
+#   601234567890,2025                        Tradlinx (BL 번호, 연도)
+#   빈 줄 / # 주석 / 인식 못 하는 줄(헤더 등)은 건너뜀
+#
+# 출력: 조회가 끝나는 대로 한 줄씩 JSONL 에 추가 (입력 순서)
+#   {"key", "line", "type", "code", "invoice" | "bl_no", "bl_year",
+#    "steps", "latest", "cleared", "cleared_at", "error", "checked_at"}
+#
+# 이어하기: 출력 파일이 이미 있으면 성공한 건(error 없음)은 건너뛰고 나머지만 조회해서 이어 씀
+#   (중간에 끊겨 잘린 마지막 줄은 무시) / --fresh 면 처음부터 새로
+#
+# 실행:
+#   python bulk_check.py tracking_list.txt                      → tracking_list.results.jsonl
+#   python bulk_check.py shipments.csv -o out.jsonl --workers 12
+#   cat list.txt | python bulk_check.py - -o out.jsonl
+# ─────────────────────────────────────────────────────────────
+
+PROGRESS_EVERY = 100
+
+
+def parse_row(fields):
+    """CSV 한 줄 → 조회 항목 (인식 못 하면 None)"""
+    fields = [f.strip() for f in fields if f and f.strip()]
+    if not fields or fields[0].startswith("#"):
+        return None
+    first = fields[0]
+
+    if first.startswith("http"):
+        qs = parse_qs(urlparse(first).query)
+        code = qs.get("code", [None])[0]
+        invoice = qs.get("invoice", [None])[0]
+        if code and invoice:
+            return {"type": "asap", "code": code, "invoice": invoice}
+        return None
+
+    if is_probably_number(first):
+        it = {"type": "tradlinx", "bl_no": first}
+        if len(fields) > 1 and fields[1].isdigit() and len(fields[1]) == 4:
+            it["bl_year"] = int(fields[1])
+        return it
+
+    if len(fields) > 1 and fields[1].isdigit():
+        return {"type": "asap", "code": first, "invoice": fields[1]}
+
+    return None
+
+
+def key_of(it):
+    if it["type"] == "asap":
+        return f"asap:{it['code']}:{it['invoice']}"
+    return f"tradlinx:{it['bl_no']}"
+
+
+def read_items(f, done, stats):
+    """입력을 한 줄씩 읽어 조회할 항목만 yield (이미 끝난 건 / 중복은 건너뜀)"""
+    for line_no, fields in enumerate(csv.reader(f), 1):
+        it = parse_row(fields)
+        if it is None:
+            if any(f.strip() for f in fields) and not fields[0].strip().startswith("#"):
+                stats["invalid"] += 1
+                print(f"[⚠️ 형식 인식 불가 → 건너뜀] {line_no}행: {','.join(fields)[:80]}")
+            continue
+        key = key_of(it)
+        if key in done:
+            stats["skipped"] += 1
+            continue
+        done.add(key)
+        it["key"] = key
+        it["line"] = line_no
+        yield it
+
+
+def load_done(path):
+    """이전 출력에서 성공한 건의 key 모음"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            try:
+                rec = json.loads(raw)
+            except ValueError:
+                continue   # 중단되며 잘린 줄
+            if rec.get("key") and not rec.get("error"):
+                done.add(rec["key"])
+    return done
+
+
+def open_output(path, fresh):
+    """이어 쓸 출력 파일 (마지막 줄이 잘려 있으면 줄바꿈부터 넣음)"""
+    if fresh or not os.path.exists(path):
+        return open(path, "w", encoding="utf-8", buffering=1)
+    needs_newline = False
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    out = open(path, "a", encoding="utf-8", buffering=1)
+    if needs_newline:
+        out.write("\n")
+    return out
+
+
+def to_record(it, steps):
+    rec = {"key": it["key"], "line": it["line"], "type": it["type"]}
+    if it["type"] == "asap":
+        rec.update(code=it["code"], invoice=it["invoice"])
+    else:
+        rec.update(bl_no=it["bl_no"], bl_year=it.get("bl_year"))
+
+    if steps is None:
+        rec["error"] = "조회 실패"
+        steps = []
+    else:
+        rec["error"] = None
+
+    cleared = next((s for s in steps if s["step"] == CLEARED_STEP), None)
+    rec.update(
+        steps=steps,
+        latest=latest_step(steps),
+        cleared=cleared is not None,
+        cleared_at=cleared["time"] if cleared else None,
+        checked_at=datetime.now().isoformat(timespec="seconds"),
+    )
+    return rec
+
+
+def run(input_path, output_path, workers=None, fresh=False):
+    done = set() if fresh else load_done(output_path)
+    if done:
+        print(f"[↩️ 이어하기] 이미 조회한 {len(done)}건 건너뜀 ({output_path})")
+
+    stats = {"checked": 0, "cleared": 0, "failed": 0, "skipped": 0, "invalid": 0}
+    started = time.perf_counter()
+
+    src = sys.stdin if input_path == "-" else open(input_path, encoding="utf-8-sig", newline="")
+    try:
+        with open_output(output_path, fresh) as out:
+            for it, steps in run_checks(read_items(src, done, stats), check_item, workers=workers):
+                rec = to_record(it, steps)
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+                stats["checked"] += 1
+                stats["cleared"] += rec["cleared"]
+                stats["failed"] += rec["error"] is not None
+
+                if stats["checked"] % PROGRESS_EVERY == 0:
+                    rate = stats["checked"] / (time.perf_counter() - started)
+                    print(f"[📦 {stats['checked']}건 / 통관 완료 {stats['cleared']} / "
+                          f"실패 {stats['failed']} / {rate:.1f}건/s]")
+    finally:
+        if src is not sys.stdin:
+            src.close()
+
+    elapsed = time.perf_counter() - started
+    record_run("bulk", stats["checked"], elapsed)
+    print(
+        f"[✅ 대량 조회 완료] 조회 {stats['checked']}건 ({stats['checked'] / max(elapsed, 1e-9):.1f}건/s) / "
+        f"통관 완료 {stats['cleared']} / 실패 {stats['failed']} / "
+        f"이미 조회·중복 {stats['skipped']} / 형식 오류 {stats['invalid']} → {output_path}"
+    )
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="대량 통관 조회 (CSV/TXT → JSONL)")
+    ap.add_argument("input", help="입력 파일 (- 면 표준입력)")
+    ap.add_argument("-o", "--output", help="결과 JSONL (기본: 입력파일.results.jsonl)")
+    ap.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="동시 조회 워커 수")
+    ap.add_argument("--fresh", action="store_true", help="이전 결과 무시하고 처음부터")
+    args = ap.parse_args(argv)
+
+    output = args.output
+    if not output:
+        if args.input == "-":
+            ap.error("표준입력을 쓸 때는 -o 로 출력 파일을 지정하세요")
+        output = os.path.splitext(args.input)[0] + ".results.jsonl"
+
+    return run(args.input, output, workers=args.workers, fresh=args.fresh)
+
+
+if __name__ == "__main__":
+    main()
+    dump_summary()
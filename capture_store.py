@@ -0,0 +1,184 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+import zlib
+
+from state_store import get_store
+
+# ─────────────────────────────────────────────────────────────
+# 디버그용 페이지 저장소 (내용 해시 기준, 압축 저장)
+#
+# - 파일 이름 = 본문 sha256 → 같은 차단 페이지가 수백 번 와도 파일은 하나 (다시 오면 시각만 갱신)
+# - zstandard 가 설치돼 있으면 zstd, 없으면 zlib 로 압축 (.zst / .z)
+# - URL → 해시 기록은 state.db 의 captures 테이블
+# - 보관 한도: CAPTURE_MAX_AGE_DAYS 보다 오래됐거나 전체가 CAPTURE_MAX_MB 를 넘으면 오래된 것부터 삭제
+#   (저장할 때 CAPTURE_PRUNE_INTERVAL 초에 한 번씩 자동 정리)
+#
+# 사용: capture(url, html, kind="taobao", reason="block") → 해시
+#   python capture_store.py list [URL]      최근 저장 기록
+#   python capture_store.py show HASH       저장한 페이지 출력
+#   python capture_store.py prune           보관 한도 적용
+#
+# 환경변수:
+#   CAPTURE_DIR            - 저장 폴더 (기본 debug_html)
+#   CAPTURE_CODEC          - zstd / zlib 강제 지정
+#   CAPTURE_MAX_MB         - 전체 용량 한도 (기본 200)
+#   CAPTURE_MAX_AGE_DAYS   - 보관 기간 (기본 7)
+#   CAPTURE_PRUNE_INTERVAL - 자동 정리 간격(초, 기본 600)
+# ─────────────────────────────────────────────────────────────
+
+CAPTURE_DIR = os.getenv("CAPTURE_DIR") or "debug_html"
+MAX_BYTES = float(os.getenv("CAPTURE_MAX_MB") or 200) * 1024 * 1024
+MAX_AGE = float(os.getenv("CAPTURE_MAX_AGE_DAYS") or 7) * 86400
+PRUNE_INTERVAL = float(os.getenv("CAPTURE_PRUNE_INTERVAL") or 600)
+
+EXTENSIONS = {"zstd": ".zst", "zlib": ".z"}
+
+
+def _detect_codec():
+    forced = os.getenv("CAPTURE_CODEC")
+    if forced:
+        return forced
+    try:
+        import zstandard  # noqa: F401
+        return "zstd"
+    except ImportError:
+        return "zlib"
+
+
+CODEC = _detect_codec()
+
+_lock = threading.Lock()
+_last_prune = 0.0
+
+
+def compress(data, codec=CODEC):
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def path_for(content_hash, codec=CODEC, root=None):
+    root = root or CAPTURE_DIR
+    return os.path.join(root, content_hash[:2], content_hash + EXTENSIONS[codec])
+
+
+def find(content_hash, root=None):
+    """저장된 파일 (경로, 코덱), 없으면 (None, None)"""
+    for codec in EXTENSIONS:
+        path = path_for(content_hash, codec, root)
+        if os.path.exists(path):
+            return path, codec
+    return None, None
+
+
+def capture(url, body, kind=None, reason=None, root=None):
+    """
+    페이지 저장 → 내용 해시
+    이미 같은 내용이 있으면 다시 쓰지 않고 파일 시각만 갱신 (보관 기간은 마지막으로 본 때 기준)
+    """
+    data = body.encode("utf-8") if isinstance(body, str) else body
+    content_hash = hashlib.sha256(data).hexdigest()
+
+    path, _ = find(content_hash, root)
+    if path:
+        os.utime(path)
+    else:
+        path = path_for(content_hash, root=root)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(compress(data))
+        os.replace(tmp, path)
+
+    get_store().add_capture(url, content_hash, kind, reason, len(data))
+    _maybe_prune(root)
+    return content_hash
+
+
+def load(content_hash, root=None):
+    """저장한 페이지 본문 (없으면 None)"""
+    path, codec = find(content_hash, root)
+    if not path:
+        return None
+    with open(path, "rb") as f:
+        return decompress(f.read(), codec).decode("utf-8", errors="replace")
+
+
+def _maybe_prune(root=None):
+    global _last_prune
+    with _lock:
+        if time.time() - _last_prune < PRUNE_INTERVAL:
+            return
+        _last_prune = time.time()
+    prune(root=root)
+
+
+def prune(max_bytes=MAX_BYTES, max_age=MAX_AGE, root=None):
+    """보관 한도 적용 → (삭제한 파일 수, 남은 용량)"""
+    root = root or CAPTURE_DIR
+    files = []
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if not name.endswith(tuple(EXTENSIONS.values())):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path, name.split(".", 1)[0]))
+
+    files.sort()   # 오래된 것부터
+    total = sum(f[1] for f in files)
+    cutoff = time.time() - max_age
+    removed = []
+
+    for mtime, size, path, content_hash in files:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            os.rmdir(os.path.dirname(path))   # 비었을 때만 지워짐
+        except OSError:
+            pass
+        total -= size
+        removed.append(content_hash)
+
+    if removed:
+        get_store().drop_captures(removed)
+        get_store().commit()
+        print(f"[🧹 캡처 정리] {len(removed)}개 삭제 (남은 용량 {total / 1024 / 1024:.1f}MB)")
+    return len(removed), total
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    if cmd == "list":
+        for row in get_store().captures(sys.argv[2] if len(sys.argv) > 2 else None):
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["captured_at"]))
+            print(f"{when}  {row['hash'][:16]}  {row['kind'] or '-':<8} {row['size'] or 0:>8}B  "
+                  f"{row['reason'] or '-'}  {row['url']}")
+    elif cmd == "show" and len(sys.argv) > 2:
+        prefix = sys.argv[2]
+        matches = {r["hash"] for r in get_store().captures(limit=100000) if r["hash"].startswith(prefix)}
+        html = load(matches.pop()) if len(matches) == 1 else load(prefix)
+        if html is None:
+            sys.exit(f"not found: {prefix}")
+        sys.stdout.write(html)
+    elif cmd == "prune":
+        prune()
+    else:
+        print("usage: python capture_store.py list [URL] | show HASH | prune")
+        sys.exit(1)
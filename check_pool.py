@@ -0,0 +1,100 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# ─────────────────────────────────────────────────────────────
+# 조회 동시 실행 풀
+# unipass_check.py / unipass_check_ledger.py / taobao_check.py 공용
+#
+# 환경변수:
+#   UNIPASS_WORKERS       - 전체 워커 수 (기본 6, 1이면 순차 실행)
+#   ASAP_CONCURRENCY      - asap-china.com 동시 요청 상한 (기본 4)
+#   TRADLINX_CONCURRENCY  - tradlinx.com 동시 요청 상한 (기본 2)
+#   TAOBAO_CONCURRENCY    - taobao.com 동시 요청 상한 (기본 2)
+#
+# 결과는 입력 순서 그대로 돌려주므로 Notion 반영 순서는 항상 동일
+# ─────────────────────────────────────────────────────────────
+
+ASAP_HOST = "asap-china.com"
+TRADLINX_HOST = "tradlinx.com"
+TAOBAO_HOST = "taobao.com"
+
+
+def _env_int(name, default):
+    try:
+        return max(1, int(os.getenv(name) or default))
+    except ValueError:
+        return default
+
+
+DEFAULT_WORKERS = _env_int("UNIPASS_WORKERS", 6)
+
+# 워커당 미리 제출해 둘 항목 수 (큰 입력도 전부 읽어 쌓아두지 않도록)
+PENDING_PER_WORKER = 4
+
+HOST_LIMITS = {
+    ASAP_HOST: _env_int("ASAP_CONCURRENCY", 4),
+    TRADLINX_HOST: _env_int("TRADLINX_CONCURRENCY", 2),
+    TAOBAO_HOST: _env_int("TAOBAO_CONCURRENCY", 2),
+}
+
+_host_semaphores = {host: threading.BoundedSemaphore(n) for host, n in HOST_LIMITS.items()}
+
+
+def host_of(item):
+    """조회 항목이 요청을 보낼 호스트"""
+    if item.get("type") == "asap":
+        return ASAP_HOST
+    if item.get("type") == "tradlinx":
+        return TRADLINX_HOST
+    if item.get("type") == "taobao":
+        return TAOBAO_HOST
+    return None
+
+
+def _run_one(check, item):
+    sem = _host_semaphores.get(host_of(item))
+    try:
+        if sem is None:
+            return check(item)
+        with sem:
+            return check(item)
+    except Exception as e:
+        key = item.get("invoice") or item.get("bl_no") or item.get("url") or item.get("raw", "")
+        print(f"[⚠️ 조회 실패] {key}: {e}")
+        return None
+
+
+def run_checks(items, check, workers=None):
+    """
+    items 각각에 check(item) 를 동시에 실행하고 (item, steps) 를 입력 순서대로 yield
+    - items 는 제너레이터여도 됨: 들어오는 대로 바로 제출 (Notion 페이지 로딩과 조회가 겹침)
+      결과를 못 내보낸 항목이 workers × PENDING_PER_WORKER 개면 앞 항목이 끝날 때까지 읽기를 멈춤
+    - 호스트별 동시 요청 수는 HOST_LIMITS 로 제한
+    - 예외가 난 항목은 steps = None (한 건 실패로 전체가 멈추지 않도록, '단계 없음'과 구분)
+    """
+    workers = workers or DEFAULT_WORKERS
+
+    if workers <= 1:
+        for it in items:
+            yield it, _run_one(check, it)
+        return
+
+    max_pending = workers * PENDING_PER_WORKER
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for it in items:
+            while len(pending) >= max_pending:
+                head, fut = pending.popleft()
+                yield head, fut.result()
+            pending.append((it, pool.submit(_run_one, check, it)))
+            # 앞에서부터 끝난 것은 바로 내보냄 (순서 유지)
+            while pending and pending[0][1].done():
+                head, fut = pending.popleft()
+                yield head, fut.result()
+
+        while pending:
+            head, fut = pending.popleft()
+            yield head, fut.result()
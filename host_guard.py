@@ -0,0 +1,102 @@
+import threading
+import time
+
+# ─────────────────────────────────────────────────────────────
+# 차단 감지형 요청 속도 조절 + 서킷 브레이커 (호스트 단위)
+# taobao_check.py / taobao_stock_check.py 에서 사용
+#
+# - 요청 간격: 기본 min_interval, 차단이 보이면 2배씩 늘리고 (max_interval 까지)
+#   정상 응답이 이어지면 조금씩 원래 간격으로 되돌림
+# - 연속 차단이 threshold 번이면 cooldown 초 동안 요청 중단 (서킷 열림)
+#   쿨다운이 끝나면 다시 시도하고, 바로 또 차단되면 곧장 다시 열림
+# - 한 실행에서 서킷이 max_trips 번 열리면 남은 요청은 보내지 않음 (차단을 더 깊게 만들지 않도록)
+# - 실행마다 요청 수 / 차단 수 / 처리량 집계 → report()
+# ─────────────────────────────────────────────────────────────
+
+
+class HostGuard:
+    def __init__(self, name, min_interval=0.5, max_interval=30.0, threshold=3, cooldown=120.0, max_trips=3):
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.lock = threading.Lock()
+
+        # 실행 간 유지 (상주 데몬에서는 다음 실행도 느려진 간격부터 시작)
+        self.interval = min_interval
+        self.next_at = 0.0
+        self.open_until = 0.0
+        self.consecutive = 0
+        self.start_run()
+
+    def start_run(self):
+        with self.lock:
+            self.trips = 0
+            self.requests = 0
+            self.blocked = 0
+            self.skipped = 0
+            self.waited = 0.0
+            self.started_at = time.time()
+
+    def acquire(self):
+        """요청 보내기 전 호출: 차례가 올 때까지 대기, 이번 실행에서 포기한 상태면 False"""
+        with self.lock:
+            if self.trips >= self.max_trips:
+                self.skipped += 1
+                return False
+            now = time.time()
+            slot = max(now, self.next_at, self.open_until)
+            self.next_at = slot + self.interval
+            self.requests += 1
+        wait = slot - now
+        if wait > 0:
+            with self.lock:
+                self.waited += wait
+            time.sleep(wait)
+        return True
+
+    def record(self, blocked):
+        """응답 판정 결과 반영 (blocked: 로그인 / 캡차 / 접근 제한 페이지였는지)"""
+        with self.lock:
+            if not blocked:
+                self.consecutive = 0
+                self.interval = max(self.min_interval, self.interval * 0.8)
+                return
+
+            self.blocked += 1
+            self.consecutive += 1
+            self.interval = min(self.max_interval, max(self.interval * 2, self.min_interval or 0.5))
+
+            if self.consecutive >= self.threshold and time.time() >= self.open_until:
+                self.trips += 1
+                self.open_until = time.time() + self.cooldown
+                # 쿨다운 뒤 첫 요청이 또 차단되면 바로 다시 열리도록
+                self.consecutive = self.threshold - 1
+                if self.trips >= self.max_trips:
+                    print(f"[🛑 {self.name} 서킷 {self.trips}회 열림 → 이번 실행 남은 요청 중단]")
+                else:
+                    print(f"[🔌 {self.name} 연속 차단 → {self.cooldown:g}초 동안 요청 중단 "
+                          f"(간격 {self.interval:.1f}s)]")
+
+    def is_open(self):
+        with self.lock:
+            return self.trips >= self.max_trips or time.time() < self.open_until
+
+    def report(self):
+        with self.lock:
+            elapsed = max(time.time() - self.started_at, 1e-9)
+            done = self.requests
+            return {
+                "host": self.name,
+                "requests": done,
+                "blocked": self.blocked,
+                "skipped": self.skipped,
+                "block_rate": round(self.blocked / done, 3) if done else 0.0,
+                "throughput": round((done - self.blocked) / elapsed, 2),   # 차단 아닌 응답 / 초
+                "seconds": round(elapsed, 1),
+                "waited_seconds": round(self.waited, 1),
+                "interval": round(self.interval, 2),
+                "circuit_trips": self.trips,
+            }
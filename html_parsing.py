@@ -0,0 +1,330 @@
+import json
+import os
+import re
+import sys
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from metrics import timed_parse
+
+# ─────────────────────────────────────────────────────────────
+# HTML 파싱 공용 모듈 (ASAP 통관 조회 / Tradlinx / ASAP 주문 목록 / 타오바오 상품)
+#
+# - lxml 이 설치돼 있으면 lxml 백엔드 사용 (없으면 html.parser)
+# - SoupStrainer 로 필요한 영역(table / cargo-process / tr)만 트리로 만듦
+# - 빠른 경로 결과가 의심스러우면(비었는데 대상 태그가 있음 등) 기존 방식으로 다시 파싱
+# - 파싱 시간은 metrics 의 parse_seconds{parser} 에 기록
+#
+# 기존 구현은 legacy_* 로 그대로 남겨 결과 비교에 사용:
+#   python html_parsing.py asap|tradlinx|orders|taobao FILE...
+#
+# 환경변수:
+#   HTML_PARSER   - 백엔드 강제 지정 (lxml / html.parser)
+# ─────────────────────────────────────────────────────────────
+
+
+def _detect_parser():
+    forced = os.getenv("HTML_PARSER")
+    if forced:
+        return forced
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+PARSER = _detect_parser()
+
+ASAP_STRAINER = SoupStrainer("table")
+TRADLINX_STRAINER = SoupStrainer("div", class_="cargo-process")
+ORDER_ROW_STRAINER = SoupStrainer("tr")
+
+# 주문 목록에서 송장번호 링크(<a href=..>숫자</a>) 개수 확인용
+ORDER_LINK_RE = re.compile(r"<a\b[^>]*\bhref\s*=[^>]*>\s*\d+\s*</a>", re.I)
+# 주문 행의 주문일 (YYYY-MM-DD / YYYY.MM.DD)
+ORDER_DATE_RE = re.compile(r"(20\d{2})[-.](\d{2})[-.](\d{2})")
+
+
+def _soup(html, parse_only=None):
+    try:
+        return BeautifulSoup(html, PARSER, parse_only=parse_only)
+    except Exception:
+        # 백엔드 문제 시 기본 파서로
+        return BeautifulSoup(html, "html.parser", parse_only=parse_only)
+
+
+# ── ASAP 유니패스 조회 (두 번째 table 의 처리단계) ─────────────
+def _asap_steps_from(soup):
+    tables = soup.find_all("table")
+    if len(tables) < 2:
+        return []
+
+    table = tables[1]
+    rows = table.find_all("tr")[1:]  # 헤더 제외
+
+    steps = []
+    for row in rows:
+        tds = row.find_all("td")
+        if len(tds) > 2:
+            step_text = tds[1].get_text(strip=True)
+            time_text = tds[2].get_text(strip=True)
+            steps.append({"step": step_text, "time": time_text})
+
+    return steps
+
+
+def legacy_parse_asap_steps(html):
+    return _asap_steps_from(BeautifulSoup(html, "html.parser"))
+
+
+@timed_parse("asap")
+def parse_asap_steps(html):
+    steps = _asap_steps_from(_soup(html, ASAP_STRAINER))
+    if not steps and html.lower().count("<table") >= 2:
+        return legacy_parse_asap_steps(html)
+    return steps
+
+
+# ── Tradlinx 유니패스 조회 (cargo-process) ────────────────────
+def _tradlinx_steps_from(soup):
+    cargo = soup.find("div", class_="cargo-process")
+    if not cargo:
+        return []
+
+    steps = []
+    for pd in cargo.find_all("div", class_="process-detail"):
+        step_el = pd.select_one("ul li.tp-cd")
+        time_el = pd.select_one("ul li.rl-br-dttm")
+        if step_el and time_el:
+            step = step_el.get_text(strip=True)
+            time = time_el.get_text(strip=True)
+            steps.append({"step": step, "time": time})
+
+    return steps
+
+
+def legacy_parse_tradlinx_steps(html):
+    return _tradlinx_steps_from(BeautifulSoup(html, "html.parser"))
+
+
+@timed_parse("tradlinx")
+def parse_tradlinx_steps(html):
+    if "cargo-process" not in html:
+        return []   # 대상 영역이 없으면 파싱할 필요도 없음
+    steps = _tradlinx_steps_from(_soup(html, TRADLINX_STRAINER))
+    if not steps:
+        return legacy_parse_tradlinx_steps(html)
+    return steps
+
+
+# ── ASAP 주문 목록 (ajax.nt_order_list_member.php) ────────────
+def _orders_from(soup):
+    orders = []
+
+    for a in soup.find_all("a", href=True):
+
+        invoice = a.get_text(strip=True)
+
+        if not invoice.isdigit():
+            continue
+
+        link = a["href"]
+
+        if link.startswith("http"):
+            full_link = link
+        else:
+            full_link = "https://www.asap-china.com" + link
+
+        name = ""
+        order_date = None
+
+        current_tr = a.find_parent("tr")
+
+        if current_tr:
+            m = ORDER_DATE_RE.search(current_tr.get_text(" ", strip=True))
+            if m:
+                order_date = "-".join(m.groups())
+
+            next_tr = current_tr.find_next_sibling("tr")
+
+            if next_tr:
+                p_tags = next_tr.find_all("p")
+
+                if len(p_tags) >= 2:
+                    name = p_tags[1].get_text(strip=True)
+                elif len(p_tags) == 1:
+                    name = p_tags[0].get_text(strip=True)
+
+        if "배송" in name:
+            name = ""
+
+        orders.append({
+            "invoice": invoice,
+            "link": full_link,
+            "name": name,
+            "date": order_date,
+        })
+
+    return orders
+
+
+def legacy_parse_orders(html):
+    return _orders_from(BeautifulSoup(html, "html.parser"))
+
+
+@timed_parse("orders")
+def parse_orders(html):
+    """
+    주문 행(tr)만 파싱. 송장 링크 개수가 원문과 다르면
+    (tr 밖에 있는 링크 등) 기존 방식으로 전체 파싱
+    """
+    orders = _orders_from(_soup(html, ORDER_ROW_STRAINER))
+    if len(orders) != len(ORDER_LINK_RE.findall(html)):
+        return legacy_parse_orders(html)
+    return orders
+
+
+# ── 타오바오 상품 페이지 (window.__ICE_APP_CONTEXT__ = {...}) ──
+ICE_MARKER = "__ICE_APP_CONTEXT__"
+
+_json_decoder = json.JSONDecoder()
+
+
+def _ice_item_from(ctx):
+    """
+    ICE 컨텍스트 → 상품 / SKU별 재고·가격
+    {"item_id", "title", "skus": [{"sku_id", "props", "quantity", "quantity_text", "price"}],
+     "total_quantity", "in_stock"}
+    """
+    try:
+        res = ctx["loaderData"]["home"]["data"]["res"]
+    except (KeyError, TypeError):
+        return None
+
+    item = res.get("item") or {}
+    sku_base = res.get("skuBase") or {}
+    sku2info = (res.get("skuCore") or {}).get("sku2info") or {}
+
+    # propPath("pid:vid;pid:vid") → 속성 이름 / 값 이름
+    names = {}
+    for prop in sku_base.get("props") or []:
+        for v in prop.get("values") or []:
+            names[f"{prop.get('pid')}:{v.get('vid')}"] = (prop.get("name"), v.get("name"))
+
+    def quantity(info):
+        try:
+            return int(info.get("quantity") or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    skus = []
+    for sku in sku_base.get("skus") or []:
+        info = sku2info.get(str(sku.get("skuId"))) or {}
+        props = {}
+        for part in (sku.get("propPath") or "").split(";"):
+            if part in names:
+                k, v = names[part]
+                props[k] = v
+        skus.append({
+            "sku_id": str(sku.get("skuId")),
+            "props": props,
+            "quantity": quantity(info),
+            "quantity_text": info.get("quantityText"),
+            "price": (info.get("price") or {}).get("priceText"),
+        })
+
+    # "0" 은 상품 전체 합계 (옵션이 없는 상품은 이것만 있음)
+    total = sku2info.get("0")
+    total_quantity = quantity(total) if total else sum(s["quantity"] for s in skus)
+    in_stock = any(s["quantity"] > 0 for s in skus) if skus else total_quantity > 0
+
+    return {
+        "item_id": item.get("itemId"),
+        "title": item.get("title"),
+        "skus": skus,
+        "total_quantity": total_quantity,
+        "in_stock": in_stock,
+    }
+
+
+def extract_ice_context(html):
+    """
+    DOM 을 만들지 않고 마커 뒤의 JSON 객체만 디코딩 (raw_decode 가 괄호 짝이 맞는 곳에서 멈춤)
+    없거나 깨졌으면 None
+    """
+    pos = html.find(ICE_MARKER)
+    while pos != -1:
+        start = html.find("{", pos)
+        eq = html.find("=", pos)
+        # "window.__ICE_APP_CONTEXT__ = {" 형태만 (다른 문자열 안의 언급은 건너뜀)
+        if start != -1 and eq != -1 and eq < start and not html[pos + len(ICE_MARKER):eq].strip() \
+                and not html[eq + 1:start].strip():
+            try:
+                return _json_decoder.raw_decode(html, start)[0]
+            except ValueError:
+                pass
+        pos = html.find(ICE_MARKER, pos + len(ICE_MARKER))
+    return None
+
+
+def legacy_parse_taobao_item(html):
+    soup = BeautifulSoup(html, "html.parser")
+    for script in soup.find_all("script"):
+        text = script.string or ""
+        if ICE_MARKER not in text:
+            continue
+        raw = text.split("=", 1)[1].strip().rstrip(";")
+        try:
+            return _ice_item_from(json.loads(raw))
+        except ValueError:
+            return None
+    return None
+
+
+@timed_parse("taobao")
+def parse_taobao_item(html):
+    ctx = extract_ice_context(html)
+    return _ice_item_from(ctx) if ctx is not None else None
+
+
+# 조회 결과가 정말 없을 때 페이지에 나오는 문구 → 단계가 비었는데 이것도 없으면 파싱 실패로 봄
+NO_RESULT_MARKERS = {
+    "asap": ("결과가 없습니다",),
+    "tradlinx": ("조회된 정보가 없습니다",),
+}
+
+
+def parse_failed(kind, html, steps):
+    """단계를 못 찾았고 '결과 없음' 페이지도 아니면 True (페이지 구조 변경 / 오류 페이지 의심)"""
+    return not steps and not any(m in html for m in NO_RESULT_MARKERS.get(kind, ()))
+
+
+PARSERS = {
+    "asap": (parse_asap_steps, legacy_parse_asap_steps),
+    "tradlinx": (parse_tradlinx_steps, legacy_parse_tradlinx_steps),
+    "orders": (parse_orders, legacy_parse_orders),
+    "taobao": (parse_taobao_item, legacy_parse_taobao_item),
+}
+
+
+def compare(kind, html):
+    """빠른 파서와 기존 파서 결과가 같은지"""
+    fast, legacy = PARSERS[kind]
+    return fast(html) == legacy(html)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in PARSERS:
+        print("사용법: python html_parsing.py asap|tradlinx|orders|taobao FILE...")
+        sys.exit(2)
+
+    kind, paths = sys.argv[1], sys.argv[2:]
+    mismatched = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            ok = compare(kind, f.read())
+        mismatched += not ok
+        print(f"[{'✅ 동일' if ok else '❌ 불일치'}] {path} ({PARSER})")
+
+    sys.exit(1 if mismatched else 0)
@@ -0,0 +1,181 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# ─────────────────────────────────────────────────────────────
+# 공용 HTTP 클라이언트
+# 모든 스크립트(유니패스 / ASAP / 타오바오 / Notion)가 같은 세션을 사용
+#
+# - 호스트별 커넥션 풀 + keep-alive → 요청마다 TCP/TLS 핸드셰이크 제거
+# - 기본 타임아웃 (Notion 호출도 무한 대기하지 않음)
+# - 429 / 5xx 재시도: 지수 백오프 + 지터, Retry-After 헤더 우선
+# - 시도마다 호스트별 지연 / 응답 코드를 metrics 에 기록
+#
+# 환경변수:
+#   HTTP_POOL_SIZE     - 호스트당 유지할 커넥션 수 (기본 10)
+#   HTTP_MAX_RETRIES   - 최대 재시도 횟수 (기본 3)
+#   HTTP_HOST_OVERRIDES - 호스트를 다른 주소로 돌리기 (벤치마크 / 로컬 스텁 서버용)
+#                         예: "asap-china.com=http://127.0.0.1:8765,api.notion.com=http://127.0.0.1:8765"
+# ─────────────────────────────────────────────────────────────
+
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE") or 10)
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES") or 3)
+
+BACKOFF_BASE = 0.5   # 첫 재시도 최대 대기(초)
+BACKOFF_MAX = 30.0   # 재시도 대기 상한(초)
+
+# (connect, read) 초
+DEFAULT_TIMEOUT = (5, 20)
+HOST_TIMEOUTS = {
+    "api.notion.com": (5, 30),
+    "www.tradlinx.com": (5, 25),
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE"}
+
+def _parse_overrides(raw):
+    overrides = {}
+    for part in (raw or "").split(","):
+        host, _, base = part.partition("=")
+        if host.strip() and base.strip():
+            overrides[host.strip()] = base.strip().rstrip("/")
+    return overrides
+
+
+HOST_OVERRIDES = _parse_overrides(os.getenv("HTTP_HOST_OVERRIDES"))
+
+_session_lock = threading.Lock()
+_shared_session = None
+
+
+def new_session():
+    """풀 설정이 적용된 새 세션 (로그인 쿠키처럼 상태가 필요한 경우 사용)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def shared_session():
+    """프로세스 전체에서 공유하는 세션"""
+    global _shared_session
+    if _shared_session is None:
+        with _session_lock:
+            if _shared_session is None:
+                _shared_session = new_session()
+    return _shared_session
+
+
+def set_host_overrides(overrides):
+    """{호스트: "http://127.0.0.1:8765"} — 해당 호스트로 가는 요청을 다른 주소로 보냄"""
+    HOST_OVERRIDES.clear()
+    HOST_OVERRIDES.update({h: b.rstrip("/") for h, b in overrides.items()})
+
+
+def resolve_url(url):
+    if not HOST_OVERRIDES:
+        return url
+    parsed = urlparse(url)
+    base = HOST_OVERRIDES.get(parsed.hostname or "")
+    if not base:
+        return url
+    rest = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+    return base + rest
+
+
+def default_timeout(url):
+    return HOST_TIMEOUTS.get(urlparse(url).hostname or "", DEFAULT_TIMEOUT)
+
+
+def retry_after_seconds(resp):
+    """Retry-After 헤더 (초 또는 HTTP-date) → 초, 없으면 None"""
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt, resp=None):
+    """attempt(0부터) 번째 재시도 전 대기 시간"""
+    wait = retry_after_seconds(resp)
+    if wait is not None:
+        return min(wait, BACKOFF_MAX) + random.uniform(0, BACKOFF_BASE)
+    # full jitter
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(method, url, session=None, timeout=None, retries=None, idempotent=None, **kwargs):
+    """
+    requests.request 와 같은 인자 + 재시도
+    - idempotent 가 아니면(기본: POST) 429 에서만 재시도 → 페이지 중복 생성 방지
+      (조회용 POST 는 idempotent=True 로 호출)
+    - 재시도 후에도 실패하면 마지막 응답을 그대로 반환 (기존 코드처럼 status_code 로 판단)
+    """
+    method = method.upper()
+    sess = session or shared_session()
+    timeout = timeout or default_timeout(url)
+    host = urlparse(url).hostname or ""   # 지표는 오버라이드 전 원래 호스트 기준
+    url = resolve_url(url)
+    retries = MAX_RETRIES if retries is None else retries
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            resp = sess.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            metrics.observe_request(host, "error", time.perf_counter() - start)
+            # 연결 자체가 안 된 경우는 항상 재시도 가능
+            safe = idempotent or isinstance(e, requests.ConnectTimeout)
+            if not safe or attempt >= retries:
+                raise
+            delay = backoff_delay(attempt)
+            print(f"[↻ 재시도 {attempt + 1}/{retries}] {method} {url}: {e} ({delay:.1f}s 후)")
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        metrics.observe_request(host, resp.status_code, time.perf_counter() - start)
+
+        retryable = resp.status_code == 429 or (idempotent and resp.status_code in RETRY_STATUSES)
+        if not retryable or attempt >= retries:
+            return resp
+
+        delay = backoff_delay(attempt, resp)
+        print(f"[↻ 재시도 {attempt + 1}/{retries}] {method} {url}: HTTP {resp.status_code} ({delay:.1f}s 후)")
+        time.sleep(delay)
+        attempt += 1
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return request("PATCH", url, **kwargs)
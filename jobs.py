@@ -0,0 +1,175 @@
+import importlib
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+
+# ─────────────────────────────────────────────────────────────
+# 프로세스 안에서 추적 스크립트를 작업으로 실행 (app.py 상주 데몬 / server.py /run)
+#
+# - 작업 이름 → "모듈:함수" (처음 실행할 때 import → 필요 없는 의존성은 안 불러옴)
+# - 같은 작업은 동시에 하나만: 실행 중에 다시 요청하면 새로 만들지 않고 실행 중인 작업을 돌려줌
+# - 작업마다 id / 상태 / 진행 건수 기록 (최근 JOB_HISTORY 개)
+#   스크립트 쪽에서는 progress("checked") 처럼 부르기만 하면 됨 (작업 밖에서 부르면 무시)
+# - 모듈은 한 번 import 되면 계속 살아 있으므로 HTTP 세션 / ASAP 로그인 / 상태 DB 연결 재사용
+# ─────────────────────────────────────────────────────────────
+
+JOBS = {
+    "unipass": "unipass_sync:main",             # 송장 DB + 장부 DB 통합
+    "unipass_check": "unipass_check:main",      # 송장 DB 만
+    "ledger": "unipass_check_ledger:main",      # 장부 DB 만
+    "asap": "asap_tracker:main",                # ASAP 주문 → 송장 DB
+    "taobao": "taobao_alert:main",              # 타오바오 재입고 알림
+}
+
+JOB_HISTORY = 100
+
+_current = threading.local()
+
+
+def resolve(name):
+    module, func = JOBS[name].split(":")
+    return getattr(importlib.import_module(module), func)
+
+
+def progress(key, n=1):
+    """지금 스레드에서 실행 중인 작업의 진행 건수 증가"""
+    job = getattr(_current, "job", None)
+    if job is not None:
+        job.add(key, n)
+
+
+def set_progress(**values):
+    """진행 값 지정 (예: total=120)"""
+    job = getattr(_current, "job", None)
+    if job is not None:
+        job.set(**values)
+
+
+class Job:
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.state = "queued"    # queued → running → done / failed
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def add(self, key, n=1):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + n
+
+    def set(self, **values):
+        with self.lock:
+            self.counts.update(values)
+
+    def to_dict(self):
+        with self.lock:
+            end = self.finished_at or time.time()
+            return {
+                "id": self.id,
+                "name": self.name,
+                "state": self.state,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "seconds": round(end - self.started_at, 2) if self.started_at else None,
+                "progress": dict(self.counts),
+                "error": self.error,
+            }
+
+
+class JobRunner:
+    def __init__(self, jobs=JOBS):
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.running = {}            # 이름 → Job (실행 중)
+        self.threads = {}            # 이름 → 스레드
+        self.history = OrderedDict()  # id → Job (최근 JOB_HISTORY 개)
+
+    def submit(self, name, fn=None):
+        """
+        작업을 백그라운드 스레드로 시작 → (Job, 새로 시작했는지)
+        같은 이름의 작업이 실행 중이면 그 Job 을 그대로 돌려줌 (중복 실행 안 함)
+        fn 을 주면 JOBS 대신 그 함수 실행
+        """
+        if fn is None and name not in self.jobs:
+            raise KeyError(f"unknown job: {name}")
+
+        with self.lock:
+            if name in self.running:
+                return self.running[name], False
+
+            job = Job(name)
+            self.running[name] = job
+            self.history[job.id] = job
+            while len(self.history) > JOB_HISTORY:
+                self.history.popitem(last=False)
+
+            t = threading.Thread(target=self._run, args=(job, fn), name=f"job-{name}", daemon=True)
+            self.threads[name] = t
+        t.start()
+        return job, True
+
+    def start(self, name, fn=None):
+        """작업 시작, 이미 실행 중이면 False"""
+        return self.submit(name, fn)[1]
+
+    def _run(self, job, fn):
+        _current.job = job
+        job.state = "running"
+        job.started_at = time.time()
+        try:
+            (fn or resolve(job.name))()
+            job.state = "done"
+        except Exception as e:
+            job.state = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+            print(f"[❌ 작업 실패] {job.name}")
+            traceback.print_exc()
+        finally:
+            job.finished_at = time.time()
+            _current.job = None
+            with self.lock:
+                self.running.pop(job.name, None)
+                self.threads.pop(job.name, None)
+
+    def get(self, job_id):
+        with self.lock:
+            return self.history.get(job_id)
+
+    def is_running(self, name):
+        with self.lock:
+            return name in self.running
+
+    def wait(self, timeout=None):
+        """실행 중인 작업이 끝날 때까지 대기, 모두 끝났으면 True"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self.lock:
+                threads = list(self.threads.values())
+            if not threads:
+                return True
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                return False
+            threads[0].join(remaining)
+
+    def status(self):
+        with self.lock:
+            jobs = list(self.history.values())
+            running = sorted(self.running)
+        last = {}
+        for job in jobs:
+            if job.finished_at:
+                last[job.name] = job.to_dict()
+        return {"running": running, "last": last}
+
+    def recent(self, limit=20):
+        with self.lock:
+            jobs = list(self.history.values())[-limit:]
+        return [job.to_dict() for job in reversed(jobs)]
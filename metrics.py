@@ -0,0 +1,195 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+# ─────────────────────────────────────────────────────────────
+# 실행 지표 수집 (외부 의존성 없음)
+#
+#   http_request_seconds{host}        호스트별 요청 지연 히스토그램 (재시도는 시도마다 1건)
+#   http_responses_total{host,status} 호스트별 응답 코드 수 (연결 실패는 status="error")
+#   parse_seconds{parser}             파서별 파싱 시간 히스토그램
+#   tracker_shipments_total{job}      실행별 처리 건수 누적 / tracker_last_run_* 마지막 실행 값
+#
+# - app.py / server.py 의 /metrics 에서 Prometheus 텍스트 형식으로 노출
+# - CLI 실행 끝에는 dump_summary() 로 JSON 요약 출력 (METRICS_FILE 이 있으면 파일에도 저장)
+# ─────────────────────────────────────────────────────────────
+
+METRICS_FILE = os.getenv("METRICS_FILE")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # 마지막 칸은 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """버킷 경계 기준 근사값 (해당 버킷 상한, +Inf 칸이면 최댓값)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count * 1000, 2) if self.count else 0.0,
+            "p95_ms": round(self.quantile(0.95) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}    # host → Histogram
+            self.statuses = {}    # (host, status) → 수
+            self.parses = {}      # parser → Histogram
+            self.runs = {}        # job → {"runs", "shipments", "last_shipments", "last_seconds", "last_at"}
+            self.started_at = time.time()
+
+    def observe_request(self, host, status, seconds):
+        with self.lock:
+            self.requests.setdefault(host, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            key = (host, str(status))
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def observe_parse(self, parser, seconds):
+        with self.lock:
+            self.parses.setdefault(parser, Histogram(PARSE_BUCKETS)).observe(seconds)
+
+    def record_run(self, job, shipments, seconds):
+        with self.lock:
+            r = self.runs.setdefault(job, {"runs": 0, "shipments": 0})
+            r["runs"] += 1
+            r["shipments"] += shipments
+            r["last_shipments"] = shipments
+            r["last_seconds"] = round(seconds, 3)
+            r["last_at"] = time.time()
+
+    # ── 출력 ──
+    def summary(self):
+        with self.lock:
+            http = {}
+            for host, h in sorted(self.requests.items()):
+                http[host] = h.summary()
+                http[host]["status"] = {
+                    s: n for (hh, s), n in sorted(self.statuses.items()) if hh == host
+                }
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "http": http,
+                "parse": {p: h.summary() for p, h in sorted(self.parses.items())},
+                "runs": {j: dict(r) for j, r in sorted(self.runs.items())},
+            }
+
+    def prometheus(self):
+        lines = []
+
+        def histogram(name, help_text, label, items):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for value, h in sorted(items):
+                cumulative = 0
+                for bound, c in zip(list(h.buckets) + ["+Inf"], h.counts):
+                    cumulative += c
+                    lines.append(f'{name}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label}="{value}"}} {h.sum:.6f}')
+                lines.append(f'{name}_count{{{label}="{value}"}} {h.count}')
+
+        with self.lock:
+            histogram("http_request_seconds", "HTTP request latency per host.", "host", self.requests.items())
+
+            lines.append("# HELP http_responses_total HTTP responses per host and status.")
+            lines.append("# TYPE http_responses_total counter")
+            for (host, status), n in sorted(self.statuses.items()):
+                lines.append(f'http_responses_total{{host="{host}",status="{status}"}} {n}')
+
+            histogram("parse_seconds", "HTML parse duration per parser.", "parser", self.parses.items())
+
+            lines.append("# HELP tracker_runs_total Completed tracker runs.")
+            lines.append("# TYPE tracker_runs_total counter")
+            for job, r in sorted(self.runs.items()):
+                lines.append(f'tracker_runs_total{{job="{job}"}} {r["runs"]}')
+            lines.append("# HELP tracker_shipments_total Shipments processed.")
+            lines.append("# TYPE tracker_shipments_total counter")
+            for job, r in sorted(self.runs.items()):
+                lines.append(f'tracker_shipments_total{{job="{job}"}} {r["shipments"]}')
+            lines.append("# HELP tracker_last_run_shipments Shipments processed in the last run.")
+            lines.append("# TYPE tracker_last_run_shipments gauge")
+            for job, r in sorted(self.runs.items()):
+                lines.append(f'tracker_last_run_shipments{{job="{job}"}} {r["last_shipments"]}')
+            lines.append("# HELP tracker_last_run_seconds Duration of the last run.")
+            lines.append("# TYPE tracker_last_run_seconds gauge")
+            for job, r in sorted(self.runs.items()):
+                lines.append(f'tracker_last_run_seconds{{job="{job}"}} {r["last_seconds"]}')
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def observe_request(host, status, seconds):
+    registry.observe_request(host, status, seconds)
+
+
+def observe_parse(parser, seconds):
+    registry.observe_parse(parser, seconds)
+
+
+def record_run(job, shipments, seconds):
+    registry.record_run(job, shipments, seconds)
+
+
+def timed_parse(parser):
+    """파서 함수 데코레이터: 호출 시간을 parse_seconds{parser} 에 기록"""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe_parse(parser, time.perf_counter() - start)
+        return inner
+    return wrap
+
+
+def prometheus_text():
+    return registry.prometheus()
+
+
+def dump_summary(path=METRICS_FILE):
+    """CLI 실행 끝에 JSON 요약 출력 (path 가 있으면 파일로도)"""
+    data = registry.summary()
+    print("[📊 실행 지표]", json.dumps(data, ensure_ascii=False))
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    return data
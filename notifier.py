@@ -0,0 +1,250 @@
+import atexit
+import os
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+from dotenv import load_dotenv
+
+# ─────────────────────────────────────────────────────────────
+# 알림 큐 (메일)
+# 추적 스크립트는 notify() 로 이벤트만 넣고 바로 다음 조회로 진행, 백그라운드 스레드가 전송
+#
+# - 이벤트는 NOTIFY_DIGEST_SECONDS 동안 모아서 메일 한 통으로 (재입고 N건 · 통관 완료 M건)
+#   같은 창 안에서 같은 key 는 마지막 것 하나만
+# - SMTP 연결은 한 번 로그인해서 계속 재사용 (끊겼으면 NOOP 으로 확인 후 다시 연결)
+# - 전송 실패는 백오프 후 재시도, 끝까지 실패한 건은 리포트에 집계 (스크래핑은 기다리지 않음)
+# - 실행 끝에 flush_notifications() → 모아둔 이벤트 바로 전송 후 결과 출력
+#
+# 이벤트 종류: restock(타오바오 재입고) / cleared(통관목록심사완료)
+#
+# 환경변수:
+#   EMAIL_ADDRESS / EMAIL_PASSWORD / EMAIL_NAME / TO_EMAIL  - 보내는 계정 / 받는 주소
+#   SMTP_HOST / SMTP_PORT     - 기본 smtp.naver.com:465 (SSL)
+#   SMTP_SSL                  - 0 이면 평문 SMTP (로컬 테스트 서버: bench/smtp_stub.py)
+#   NOTIFY_EVENTS             - 보낼 이벤트 종류 (기본 restock,cleared)
+#   NOTIFY_DIGEST_SECONDS     - 모아 보내는 간격(초, 기본 60, 0 이면 바로)
+#   NOTIFY_RETRIES            - 최대 재시도 횟수 (기본 3)
+#   SMTP_IDLE_SECONDS         - 이만큼 쉬었으면 연결을 새로 맺음 (기본 240)
+# ─────────────────────────────────────────────────────────────
+
+load_dotenv()
+
+EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
+EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+EMAIL_NAME = os.getenv("EMAIL_NAME") or "배송 알리미"
+TO_EMAIL = os.getenv("TO_EMAIL") or EMAIL_ADDRESS
+
+SMTP_HOST = os.getenv("SMTP_HOST") or "smtp.naver.com"
+SMTP_PORT = int(os.getenv("SMTP_PORT") or 465)
+SMTP_SSL = (os.getenv("SMTP_SSL") or ("1" if SMTP_PORT == 465 else "0")) != "0"
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS") or 240)
+
+NOTIFY_EVENTS = {e.strip() for e in (os.getenv("NOTIFY_EVENTS") or "restock,cleared").split(",") if e.strip()}
+DIGEST_SECONDS = float(os.getenv("NOTIFY_DIGEST_SECONDS") or 60)
+NOTIFY_RETRIES = int(os.getenv("NOTIFY_RETRIES") or 3)
+
+# 이벤트 종류 → 메일에 쓰는 이름
+EVENT_LABELS = {
+    "restock": "🛍️ 재입고",
+    "cleared": "🎉 통관 완료",
+}
+
+
+class Notifier:
+    def __init__(self, window=DIGEST_SECONDS, retries=NOTIFY_RETRIES, events=NOTIFY_EVENTS):
+        self.window = window
+        self.retries = retries
+        self.events = events
+        self.enabled = bool(EMAIL_ADDRESS and TO_EMAIL)
+        if not self.enabled:
+            print("[🔕 메일 설정 없음 → 알림은 로그로만]")
+
+        self.pending = {}          # (kind, key) → 이벤트 (넣은 순서 유지)
+        self.first_at = None       # 지금 모으는 창이 시작된 시각
+        self.flushing = False
+        self.busy = False
+        self.cond = threading.Condition()
+
+        self.smtp = None
+        self.last_used = 0.0
+
+        self.stats = {"events": 0, "digests": 0, "retried": 0, "failed": 0}
+        self.failures = []
+
+        self.thread = threading.Thread(target=self._drain, name="notifier", daemon=True)
+        self.thread.start()
+
+    # ── 큐에 넣기 ────────────────────────────────────────────
+    def notify(self, kind, text, key=None):
+        if kind not in self.events:
+            return
+        with self.cond:
+            k = (kind, text if key is None else key)
+            self.pending.pop(k, None)
+            self.pending[k] = {"kind": kind, "text": text, "at": time.time()}
+            self.stats["events"] += 1
+            if self.first_at is None:
+                self.first_at = time.time()
+            self.cond.notify_all()
+
+    # ── 전송 ────────────────────────────────────────────────
+    def _drain(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.busy = False
+                    self.cond.notify_all()
+                    self.cond.wait()
+                # 창이 닫힐 때까지 더 모음 (flush 요청이 오면 바로)
+                while not self.flushing:
+                    remaining = self.first_at + self.window - time.time()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                batch = list(self.pending.values())
+                self.pending = {}
+                self.first_at = None
+                self.busy = True
+
+            try:
+                self._deliver(batch)
+            except Exception as e:
+                self._fail(batch, str(e))
+
+    def _deliver(self, batch):
+        msg = self.digest(batch)
+        if not self.enabled:
+            print(f"[🔕 알림] {msg['Subject']}\n{msg.get_content()}")
+            return
+
+        attempt = 0
+        while True:
+            try:
+                self._connection().send_message(msg)
+                self.last_used = time.time()
+                with self.cond:
+                    self.stats["digests"] += 1
+                print(f"[📧 알림 메일 전송] {msg['Subject']}")
+                return
+            except (smtplib.SMTPException, OSError) as e:
+                self._close()
+                if attempt >= self.retries:
+                    self._fail(batch, str(e))
+                    return
+                delay = min(60.0, 2.0 * (2 ** attempt))
+                print(f"[↻ 메일 재시도 {attempt + 1}/{self.retries}] {e} ({delay:.0f}s 후)")
+                with self.cond:
+                    self.stats["retried"] += 1
+                time.sleep(delay)
+                attempt += 1
+
+    def digest(self, batch):
+        """이벤트 목록 → 메일 한 통 (종류별로 묶음)"""
+        groups = {}
+        for ev in batch:
+            groups.setdefault(ev["kind"], []).append(ev["text"])
+
+        summary = " · ".join(f"{EVENT_LABELS.get(k, k)} {len(v)}건" for k, v in groups.items())
+        body = ""
+        for kind, lines in groups.items():
+            body += f"{EVENT_LABELS.get(kind, kind)} ({len(lines)}건)\n"
+            body += "".join(f"- {line}\n" for line in lines)
+            body += "\n"
+
+        msg = EmailMessage()
+        msg["Subject"] = f"[🔔 알림] {summary}"
+        msg["From"] = f"{EMAIL_NAME} <{EMAIL_ADDRESS}>"
+        msg["To"] = TO_EMAIL or ""
+        msg.set_content(body)
+        return msg
+
+    def _connection(self):
+        """로그인된 SMTP 연결 (오래 쉬었거나 끊겼으면 새로)"""
+        if self.smtp is not None:
+            if time.time() - self.last_used > SMTP_IDLE_SECONDS:
+                self._close()
+            else:
+                try:
+                    self.smtp.noop()
+                except (smtplib.SMTPException, OSError):
+                    self._close()
+
+        if self.smtp is None:
+            cls = smtplib.SMTP_SSL if SMTP_SSL else smtplib.SMTP
+            self.smtp = cls(SMTP_HOST, SMTP_PORT, timeout=30)
+            if EMAIL_PASSWORD:
+                self.smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
+            self.last_used = time.time()
+        return self.smtp
+
+    def _close(self):
+        if self.smtp is None:
+            return
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self.smtp = None
+
+    def _fail(self, batch, reason):
+        print(f"[⚠️ 알림 전송 실패] {len(batch)}건: {reason}")
+        with self.cond:
+            self.stats["failed"] += len(batch)
+            self.failures.append({"events": batch, "reason": reason})
+
+    # ── 마무리 ──────────────────────────────────────────────
+    def flush(self, timeout=None):
+        """모아둔 이벤트를 창을 기다리지 않고 전송, 다 보냈으면 True"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            self.flushing = True
+            self.cond.notify_all()
+            try:
+                while self.pending or self.busy:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self.cond.wait(remaining)
+            finally:
+                self.flushing = False
+        return True
+
+    def report(self):
+        s = self.stats
+        print(f"[🔔 알림] 이벤트 {s['events']} / 메일 {s['digests']} / 재시도 {s['retried']} / 실패 {s['failed']}")
+        return dict(s)
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier():
+    """프로세스 공용 알림 큐 (처음 사용할 때 시작)"""
+    global _notifier
+    if _notifier is None:
+        with _notifier_lock:
+            if _notifier is None:
+                _notifier = Notifier()
+                atexit.register(_notifier.flush, 60)
+    return _notifier
+
+
+def notify(kind, text, key=None):
+    get_notifier().notify(kind, text, key)
+
+
+def flush_notifications():
+    """실행 끝에 호출: 모아둔 알림 전송 후 결과 출력"""
+    if _notifier is None:
+        return {}
+    _notifier.flush()
+    _notifier._close()
+    stats = _notifier.report()
+    # 상주 프로세스에서는 다음 실행 집계를 새로 시작
+    with _notifier.cond:
+        _notifier.stats = dict.fromkeys(stats, 0)
+        _notifier.failures = []
+    return stats
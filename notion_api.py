@@ -0,0 +1,86 @@
+import os
+from urllib.parse import unquote
+
+import http_client
+
+# ─────────────────────────────────────────────────────────────
+# Notion REST 공용 헬퍼
+#
+# query_database: 서버측 필터 + has_more/next_cursor 페이지네이션을 따라가며
+#                 결과 페이지를 하나씩 yield (100건 제한 없음)
+# ─────────────────────────────────────────────────────────────
+
+NOTION_API_URL = "https://api.notion.com/v1"
+NOTION_TOKEN = os.getenv("NOTION_TOKEN")
+
+NOTION_HEADERS = {
+    "Authorization": f"Bearer {NOTION_TOKEN}",
+    "Notion-Version": "2022-06-28",
+    "Content-Type": "application/json",
+}
+
+_property_id_cache = {}
+
+
+def property_ids(database_id, names):
+    """
+    속성 이름 → 속성 ID (filter_properties 는 ID 를 받음)
+    DB 스키마는 DB 당 한 번만 조회, 실패하면 None (전체 속성 조회로 대체)
+    """
+    if database_id not in _property_id_cache:
+        resp = http_client.get(f"{NOTION_API_URL}/databases/{database_id}", headers=NOTION_HEADERS)
+        if resp.status_code != 200:
+            print("[DEBUG] Notion DB 스키마 조회 실패:", resp.status_code)
+            return None
+        props = resp.json().get("properties", {})
+        _property_id_cache[database_id] = {name: p.get("id") for name, p in props.items()}
+
+    schema = _property_id_cache[database_id]
+    return [schema[n] for n in names if schema.get(n)]
+
+
+def query_database(database_id, filter=None, sorts=None, properties=None, page_size=100):
+    """
+    DB 조회 결과 페이지를 하나씩 yield
+    - filter / sorts : Notion query body 그대로
+    - properties     : 응답에 포함할 속성 이름 목록 (None 이면 전체)
+    """
+    url = f"{NOTION_API_URL}/databases/{database_id}/query"
+
+    params = None
+    if properties:
+        ids = property_ids(database_id, properties)
+        if ids:
+            # 속성 ID 는 이미 URL 인코딩된 값 → requests 가 다시 인코딩하지 않도록 풀어서 전달
+            params = [("filter_properties", unquote(pid)) for pid in ids]
+
+    body = {"page_size": page_size}
+    if filter:
+        body["filter"] = filter
+    if sorts:
+        body["sorts"] = sorts
+
+    has_more = True
+    cursor = None
+
+    while has_more:
+        if cursor:
+            body["start_cursor"] = cursor
+
+        response = http_client.post(url, headers=NOTION_HEADERS, params=params, json=body, idempotent=True)
+        print("[DEBUG] Notion status:", response.status_code)
+
+        try:
+            data = response.json()
+        except Exception as e:
+            print("[DEBUG] Notion 응답 JSON 파싱 실패:", e, response.text)
+            return
+
+        if "results" not in data:
+            print("[DEBUG] Notion 응답에 'results' 키가 없음:", data)
+            return
+
+        yield from data["results"]
+
+        has_more = data.get("has_more", False)
+        cursor = data.get("next_cursor")
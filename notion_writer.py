@@ -0,0 +1,185 @@
+import atexit
+import os
+import threading
+import time
+from collections import deque
+
+import http_client
+from notion_api import NOTION_API_URL, NOTION_HEADERS
+from ratelimit import TokenBucket
+
+# ─────────────────────────────────────────────────────────────
+# Notion 쓰기 큐
+# 스크래핑 루프는 큐에 넣고 바로 다음 조회로 진행, 백그라운드 스레드가 전송
+#
+# - 토큰 버킷으로 Notion 한도(~3 req/s) 이하로 전송
+# - 아직 전송 전인 같은 페이지 업데이트는 하나로 병합
+# - 페이지 생성은 넣은 순서 그대로 전송 (SortKey 순서 유지)
+# - 429 / 5xx 는 백오프 후 재시도, 끝까지 실패한 건은 리포트에 집계
+# - 실행 끝에 flush() → 남은 요청 전송 후 결과 출력
+#
+# 환경변수:
+#   NOTION_WRITE_RATE     - 초당 요청 수 (기본 3)
+#   NOTION_WRITE_RETRIES  - 최대 재시도 횟수 (기본 5)
+# ─────────────────────────────────────────────────────────────
+
+WRITE_RATE = float(os.getenv("NOTION_WRITE_RATE") or 3)
+WRITE_RETRIES = int(os.getenv("NOTION_WRITE_RETRIES") or 5)
+
+# 생성(POST)은 요청이 Notion 까지 가지 않은 게 확실한 경우만 재시도 → 중복 생성 방지
+CREATE_RETRY_STATUSES = {429, 502, 503}
+UPDATE_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class NotionWriter:
+    def __init__(self, rate=WRITE_RATE, retries=WRITE_RETRIES):
+        self.bucket = TokenBucket(rate)
+        self.retries = retries
+
+        self.ops = deque()
+        self.pending_updates = {}   # page_id → 아직 전송 전인 update op
+        self.cond = threading.Condition()
+        self.busy = False
+
+        self.stats = {"created": 0, "updated": 0, "coalesced": 0, "retried": 0, "failed": 0}
+        self.failures = []
+
+        self.thread = threading.Thread(target=self._drain, name="notion-writer", daemon=True)
+        self.thread.start()
+
+    # ── 큐에 넣기 ────────────────────────────────────────────
+    def update_page(self, page_id, properties, label=None):
+        with self.cond:
+            op = self.pending_updates.get(page_id)
+            if op:
+                op["properties"].update(properties)
+                op["label"] = label or op["label"]
+                self.stats["coalesced"] += 1
+                return
+            op = {"kind": "update", "page_id": page_id, "properties": dict(properties), "label": label}
+            self.pending_updates[page_id] = op
+            self.ops.append(op)
+            self.cond.notify()
+
+    def create_page(self, database_id, properties, label=None, on_success=None, on_failure=None):
+        """on_success / on_failure: 전송 결과가 나오면 writer 스레드에서 호출"""
+        with self.cond:
+            self.ops.append({
+                "kind": "create",
+                "parent": {"database_id": database_id},
+                "properties": properties,
+                "label": label,
+                "on_success": on_success,
+                "on_failure": on_failure,
+            })
+            self.cond.notify()
+
+    # ── 전송 ────────────────────────────────────────────────
+    def _drain(self):
+        while True:
+            with self.cond:
+                while not self.ops:
+                    self.busy = False
+                    self.cond.notify_all()
+                    self.cond.wait()
+                op = self.ops.popleft()
+                if op["kind"] == "update":
+                    self.pending_updates.pop(op["page_id"], None)
+                self.busy = True
+
+            try:
+                self._send(op)
+            except Exception as e:
+                self._fail(op, str(e))
+
+    def _send(self, op):
+        if op["kind"] == "update":
+            method, url = "PATCH", f"{NOTION_API_URL}/pages/{op['page_id']}"
+            body = {"properties": op["properties"]}
+            retry_statuses = UPDATE_RETRY_STATUSES
+        else:
+            method, url = "POST", f"{NOTION_API_URL}/pages"
+            body = {"parent": op["parent"], "properties": op["properties"]}
+            retry_statuses = CREATE_RETRY_STATUSES
+
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            # 재시도는 여기서 토큰 버킷을 거쳐 직접 수행
+            resp = http_client.request(method, url, headers=NOTION_HEADERS, json=body, retries=0)
+
+            if resp.status_code == 200:
+                with self.cond:
+                    self.stats["created" if op["kind"] == "create" else "updated"] += 1
+                if op["label"]:
+                    print(op["label"])
+                if op.get("on_success"):
+                    op["on_success"]()
+                return resp
+
+            if resp.status_code not in retry_statuses or attempt >= self.retries:
+                self._fail(op, f"{resp.status_code} / {resp.text}")
+                return resp
+
+            delay = http_client.backoff_delay(attempt, resp)
+            print(f"[↻ Notion 재시도 {attempt + 1}/{self.retries}] HTTP {resp.status_code} ({delay:.1f}s 후)")
+            with self.cond:
+                self.stats["retried"] += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def _fail(self, op, reason):
+        print(f"[⚠️ Notion 쓰기 실패] {op.get('page_id') or op['kind']}: {reason}")
+        with self.cond:
+            self.stats["failed"] += 1
+            self.failures.append({"op": op, "reason": reason})
+        if op.get("on_failure"):
+            op["on_failure"]()
+
+    # ── 마무리 ──────────────────────────────────────────────
+    def flush(self, timeout=None):
+        """큐가 빌 때까지 대기, 다 비웠으면 True"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while self.ops or self.busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+        return True
+
+    def report(self):
+        s = self.stats
+        print(
+            f"[📝 Notion 쓰기] 생성 {s['created']} / 수정 {s['updated']} / "
+            f"병합 {s['coalesced']} / 재시도 {s['retried']} / 실패 {s['failed']}"
+        )
+        return dict(s)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """프로세스 공용 쓰기 큐 (처음 사용할 때 시작)"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = NotionWriter()
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def flush_and_report():
+    """실행 끝에 호출: 남은 쓰기 전송 후 결과 출력"""
+    if _writer is None:
+        return {}
+    _writer.flush()
+    stats = _writer.report()
+    # 상주 프로세스에서는 다음 실행 집계를 새로 시작
+    with _writer.cond:
+        _writer.stats = dict.fromkeys(stats, 0)
+        _writer.failures = []
+    return stats
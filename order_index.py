@@ -0,0 +1,146 @@
+import os
+import sys
+import threading
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+
+from state_store import get_store
+
+# ─────────────────────────────────────────────────────────────
+# 노션에 저장한 ASAP 주문 색인 (state.db 의 orders 테이블, 링크 / 송장번호 인덱스)
+#
+# add_to_notion 전에 링크 / 송장번호 인덱스로 바로 중복 확인
+# 체크포인트가 어긋나거나 조회 구간이 겹쳐도 같은 주문이 두 번 저장되지 않음
+#
+# 한 번도 만든 적이 없으면 송장 DB 를 한 번 페이지네이션으로 훑어서 다시 만듦
+#   python order_index.py rebuild
+#
+# 환경변수:
+#   NOTION_DATABASE_ID      - 재구성할 송장 DB
+# ─────────────────────────────────────────────────────────────
+
+INDEX_CHECKPOINT = "order_index"   # checkpoints 테이블에 남기는 재구성 시각
+NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
+
+
+def normalize_link(link):
+    """http/https, www 유무, 앞뒤 공백 차이는 같은 링크로 취급"""
+    link = (link or "").strip()
+    if not link:
+        return ""
+    u = urlparse(link)
+    host = u.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}{u.path}?{u.query}" if u.query else f"{host}{u.path}"
+
+
+def invoice_of(link):
+    """조회링크의 invoice 파라미터 (없으면 None)"""
+    qs = parse_qs(urlparse((link or "").strip()).query)
+    invoice = (qs.get("invoice") or [""])[0].strip()
+    return invoice or None
+
+
+class OrderIndex:
+    def __init__(self, store=None):
+        self.store = store or get_store()
+        self.lock = threading.Lock()
+        self.pending = set()    # 저장 큐에 들어갔지만 아직 결과가 안 나온 링크
+
+    @property
+    def loaded(self):
+        """재구성했거나 저장한 주문이 있으면 True"""
+        return bool(self.store.get_checkpoint(INDEX_CHECKPOINT)) or len(self) > 0
+
+    def save(self):
+        self.store.commit()
+
+    def __len__(self):
+        return self.store.count("orders")
+
+    def _contains(self, key, invoice):
+        return key in self.pending or self.store.has_order(key, invoice)
+
+    def contains(self, link, invoice=None):
+        key = normalize_link(link)
+        invoice = invoice or invoice_of(link)
+        with self.lock:
+            return self._contains(key, invoice)
+
+    def add(self, link, invoice=None):
+        key = normalize_link(link)
+        invoice = invoice or invoice_of(link)
+        with self.lock:
+            self.pending.discard(key)
+            if key:
+                self.store.add_order(key, invoice)
+
+    def reserve(self, link, invoice=None):
+        """
+        처음 보는 주문이면 저장 대기로 표시하고 True, 이미 저장됐거나 대기 중이면 False
+        저장 결과에 따라 confirm / release 호출
+        """
+        key = normalize_link(link)
+        invoice = invoice or invoice_of(link)
+        with self.lock:
+            if self._contains(key, invoice):
+                return False
+            self.pending.add(key)
+            return True
+
+    def confirm(self, link, invoice=None):
+        self.add(link, invoice)
+
+    def release(self, link):
+        with self.lock:
+            self.pending.discard(normalize_link(link))
+
+    def rebuild(self, database_id=NOTION_DATABASE_ID):
+        """송장 DB 의 모든 조회링크로 색인 재구성 (한 번의 페이지네이션 조회)"""
+        from notion_api import query_database
+
+        rows = {}
+        for page in query_database(database_id, properties=["조회링크"]):
+            url = (page.get("properties", {}).get("조회링크") or {}).get("url")
+            if url and url.strip():
+                rows[normalize_link(url)] = invoice_of(url)
+
+        with self.lock:
+            self.store.replace_orders(rows.items())
+            self.store.set_checkpoint(INDEX_CHECKPOINT, {
+                "rebuilt_at": datetime.now().isoformat(timespec="seconds"),
+                "orders": len(rows),
+            })
+            self.store.commit()
+
+        print(f"[🗂️ 주문 색인 재구성] {len(rows)}건")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """프로세스 공용 색인, 만든 적이 없으면 노션에서 재구성"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = OrderIndex()
+            if not _index.loaded and NOTION_DATABASE_ID:
+                _index.rebuild()
+        return _index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "rebuild":
+        print("사용법: python order_index.py rebuild")
+        sys.exit(2)
+
+    if not NOTION_DATABASE_ID:
+        print("❌ 노션 DB ID 없음")
+        sys.exit(1)
+
+    index = OrderIndex()
+    index.rebuild()
+    print(f"[💾 저장] {index.store.path}")
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+
+import unipass_check
+from check_pool import run_checks
+from jobs import progress
+from metrics import record_run
+from notion_writer import flush_and_report
+from ratelimit import SlidingWindow
+from status_cache import NO_STEP_INTERVAL, StatusCache, cache_key, base_interval
+from unipass_sync import load_items, group_by_shipment, apply_result
+
+# ─────────────────────────────────────────────────────────────
+# 배송건별 적응형 조회 스케줄러 (app.py 에서 상주 실행)
+#
+# 고정 시각에 전체를 도는 대신, 건마다 다음 조회 시각을 따로 계산
+#   - 최근 통관 단계가 심사완료에 가까울수록 자주 (통관목록접수 → 20분)
+#   - 아직 단계가 없으면(중국 내 운송) 드물게 (6시간)
+#   - 같은 단계에 오래 머물수록 간격을 늘림 (최대 4배)
+#   (단계별 기본 간격은 status_cache.STAGE_INTERVALS — CI 실행의 캐시 재조회 상한과 공용)
+# 전체 요청 수는 시간당 POLL_MAX_PER_HOUR 건으로 제한, 밀린 건부터 처리
+#   (HTTP 요청 기준: ASAP 1건, Tradlinx 는 시도할 BL 연도 수만큼 최대치로 계산)
+# 조회에 실패한 건은 POLL_FAIL_BACKOFF_MINUTES × 2ⁿ 뒤에 다시 (계속 실패하는 건이 한도를 다 쓰지 않도록)
+#
+# 환경변수:
+#   POLL_MAX_PER_HOUR         - 시간당 최대 HTTP 요청 수 (기본 120)
+#   POLL_REFRESH_MINUTES      - Notion 대상 목록 새로고침 주기 (기본 30분)
+#   POLL_FAIL_BACKOFF_MINUTES - 조회 실패 후 첫 재시도 간격 (기본 10분, 최대 6시간)
+# ─────────────────────────────────────────────────────────────
+
+MAX_PER_HOUR = int(os.getenv("POLL_MAX_PER_HOUR") or 120)
+REFRESH_MINUTES = float(os.getenv("POLL_REFRESH_MINUTES") or 30)
+FAIL_BACKOFF = float(os.getenv("POLL_FAIL_BACKOFF_MINUTES") or 10) * 60
+FAIL_BACKOFF_MAX = NO_STEP_INTERVAL * 60
+
+DWELL_MAX_FACTOR = 4          # 정체 시 간격 최대 배수
+DWELL_FULL_HOURS = 72         # 이 시간만큼 정체하면 최대 배수 도달
+
+
+def poll_interval(entry, now=None):
+    """캐시 항목(steps, changed_at) → 다음 조회까지 간격(초)"""
+    now = now or time.time()
+    base = base_interval(entry.get("steps", []))
+    dwell = max(0.0, now - entry.get("changed_at", now))
+    factor = min(DWELL_MAX_FACTOR, 1 + (DWELL_MAX_FACTOR - 1) * dwell / (DWELL_FULL_HOURS * 3600))
+    return base * factor
+
+
+def fetch_cost(it):
+    """이 건을 조회할 때 보낼 수 있는 최대 HTTP 요청 수"""
+    if it.get("type") == "tradlinx":
+        years = unipass_check.candidate_years(it["bl_no"], it.get("bl_year"), it.get("created_time"))
+        return len(years)
+    return 1
+
+
+class PollScheduler:
+    def __init__(self, max_per_hour=MAX_PER_HOUR, refresh_minutes=REFRESH_MINUTES, cache=None, workers=None):
+        self.budget = SlidingWindow(max_per_hour, window=3600)
+        self.refresh_seconds = refresh_minutes * 60
+        self.cache = cache or StatusCache()
+        self.workers = workers
+
+        self.items = []
+        self.loaded_at = 0.0
+        self.failures = {}             # key → (연속 실패 수, 다시 조회할 시각)
+        self.lock = threading.Lock()   # tick 중복 실행 방지
+
+    def refresh(self):
+        # 두 DB 에 같은 송장이 있어도 배송건 하나로 묶어서 한 번만 조회
+        self.items = group_by_shipment(load_items())
+        self.loaded_at = time.time()
+        print(f"[🗂️ 스케줄러 대상 새로고침] 배송 {len(self.items)}건")
+
+    def due_at(self, it, now):
+        key = cache_key(it)
+        entry = self.cache.get(key)
+        # 처음 보는 건은 바로
+        due = entry.get("fetched_at", 0) + poll_interval(entry, now) if entry else 0.0
+        failed = self.failures.get(key)
+        return max(due, failed[1]) if failed else due
+
+    def record_failure(self, key, now=None):
+        """조회 실패 → 실패 횟수에 따라 다음 조회 시각을 뒤로 미룸"""
+        now = now or time.time()
+        count = self.failures.get(key, (0, 0.0))[0] + 1
+        delay = min(FAIL_BACKOFF_MAX, FAIL_BACKOFF * (2 ** (count - 1)))
+        self.failures[key] = (count, now + delay)
+        print(f"  └ 조회 실패 {count}회 연속 → {delay / 60:.0f}분 뒤 재시도")
+
+    def due_items(self, now=None):
+        """지금 조회할 차례인 건, 가장 밀린 것부터"""
+        now = now or time.time()
+        due = [(self.due_at(it, now), i, it) for i, it in enumerate(self.items)]
+        due = [d for d in due if d[0] <= now]
+        due.sort(key=lambda d: (d[0], d[1]))
+        return [it for _, _, it in due]
+
+    def tick(self):
+        """주기적으로 호출: 차례가 된 건을 예산 안에서 조회하고 반영"""
+        if not self.lock.acquire(blocking=False):
+            return 0
+        try:
+            if time.time() - self.loaded_at >= self.refresh_seconds:
+                self.refresh()
+
+            due = self.due_items()
+            if not due:
+                return 0
+
+            # 밀린 순서대로, 최대 요청 수만큼 예산이 남아 있는 건까지
+            batch = []
+            for it in due:
+                self.cache.attach_hints(it)   # BL 연도를 알면 요청 수가 줄어듦
+                cost = fetch_cost(it)
+                if self.budget.available() < cost:
+                    break
+                self.budget.consume(cost)
+                batch.append(it)
+            if len(batch) < len(due):
+                print(f"[⏳ 시간당 한도] {len(due)}건 중 {len(batch)}건만 조회, 나머지는 다음 차례")
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            cleared = set()
+            for it, steps in run_checks(batch, unipass_check.check_item, workers=self.workers):
+                key = it.get("invoice") or it.get("bl_no")
+                print(f"[🔍 검사 완료] {key} / {it.get('name', '')}")
+                progress("checked")
+                if steps is None:
+                    self.record_failure(cache_key(it))
+                    continue
+                self.failures.pop(cache_key(it), None)
+                new_steps = self.cache.record(cache_key(it), steps, bl_year=it.get("bl_year"))
+                if apply_result(it, steps, new_steps):
+                    cleared.add(cache_key(it))
+
+            # 통관 완료된 건은 다음 새로고침 전까지 다시 보지 않음
+            self.items = [it for it in self.items if cache_key(it) not in cleared]
+
+            self.cache.save()
+            flush_and_report()
+            record_run("poll", len(batch), time.perf_counter() - started)
+            return len(batch)
+        finally:
+            self.lock.release()
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import deque
+
+# ─────────────────────────────────────────────────────────────
+# 레이트 리미터
+# TokenBucket   : rate 개/초 로 토큰이 차고, capacity 만큼까지 순간 버스트 허용
+# SlidingWindow : 최근 window 초 동안 최대 limit 건 (시간당 예산)
+# ─────────────────────────────────────────────────────────────
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, n=1):
+        """토큰이 있으면 바로 가져가고 True, 없으면 False (대기하지 않음)"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= n:
+                self.tokens -= n
+                return True
+            return False
+
+    def acquire(self, n=1):
+        """토큰이 찰 때까지 대기 후 가져감, 대기한 시간(초) 반환"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return waited
+                wait = (n - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class SlidingWindow:
+    """최근 window 초 동안 limit 건까지만 허용 (예: 시간당 요청 상한)"""
+
+    def __init__(self, limit, window=3600):
+        self.limit = int(limit)
+        self.window = float(window)
+        self.events = deque()
+        self.lock = threading.Lock()
+
+    def _expire(self, now):
+        while self.events and now - self.events[0] >= self.window:
+            self.events.popleft()
+
+    def available(self):
+        with self.lock:
+            self._expire(time.monotonic())
+            return max(0, self.limit - len(self.events))
+
+    def consume(self, n=1):
+        """가능한 만큼(최대 n) 사용하고 실제로 사용한 수 반환"""
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            n = min(n, max(0, self.limit - len(self.events)))
+            self.events.extend([now] * n)
+            return n
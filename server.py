@@ -1,6 +1,26 @@
 import os
-import requests
-from flask import Flask
+from flask import Flask, Response, jsonify, request
+
+import http_client
+from jobs import JOBS, JobRunner
+from metrics import PROMETHEUS_CONTENT_TYPE, prometheus_text
+
+# ─────────────────────────────────────────────────────────────
+# /run 트리거 서버
+#
+# POST /run            → 작업을 이 프로세스 안에서 바로 실행, 작업 id 반환
+#                        (같은 작업이 이미 실행 중이면 새로 만들지 않고 그 작업 id 반환)
+#   ?job=asap            실행할 작업 (jobs.JOBS, 기본 RUN_JOB)
+#   ?mode=github         GitHub Actions repository_dispatch 로 넘김 (기존 방식)
+# GET  /jobs/<id>      → 상태(queued/running/done/failed) + 진행 건수
+# GET  /jobs           → 최근 작업 목록
+# GET  /metrics        → Prometheus 지표 (호스트별 지연 / 응답 코드, 파서 시간, 실행별 처리 건수)
+#
+# 환경변수:
+#   RUN_JOB        - /run 기본 작업 (기본 asap)
+#   RUN_MODE       - local(기본) / github
+#   GITHUB_TOKEN   - github 모드에서 사용
+# ─────────────────────────────────────────────────────────────
 
 app = Flask(__name__)
 
@@ -10,9 +30,13 @@ GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
 # 🔥 여기에 네 레포 이름 넣어
 GITHUB_REPO = "ssuzz1n/unipass-tracker"
 
+RUN_JOB = os.environ.get("RUN_JOB") or "asap"
+RUN_MODE = os.environ.get("RUN_MODE") or "local"
 
-@app.route("/run", methods=["POST"])
-def run():
+runner = JobRunner()
+
+
+def dispatch_github():
 
     url = f"https://api.github.com/repos/{GITHUB_REPO}/dispatches"
 
@@ -26,10 +50,57 @@ def run():
         "event_type": "run-script"
     }
 
-    requests.post(url, headers=headers, json=data)
+    res = http_client.post(url, headers=headers, json=data)
+
+    # 성공 시 204 No Content
+    if res.status_code >= 300:
+        print("❌ GitHub dispatch 실패:", res.status_code, res.text[:200])
+        return jsonify({"error": "github dispatch failed", "status": res.status_code}), 502
 
     return "Triggered GitHub Actions", 200
 
 
+@app.route("/run", methods=["POST"])
+def run():
+
+    body = request.get_json(silent=True) or {}
+    mode = request.args.get("mode") or body.get("mode") or RUN_MODE
+    name = request.args.get("job") or body.get("job") or RUN_JOB
+
+    if mode == "github":
+        return dispatch_github()
+
+    if name not in JOBS:
+        return jsonify({"error": f"unknown job: {name}", "jobs": sorted(JOBS)}), 404
+
+    job, created = runner.submit(name)
+    result = job.to_dict()
+    result["deduplicated"] = not created
+
+    return jsonify(result), 202 if created else 200
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+
+    job = runner.get(job_id)
+    if not job:
+        return jsonify({"error": "job not found"}), 404
+
+    return jsonify(job.to_dict())
+
+
+@app.route("/jobs")
+def jobs():
+
+    return jsonify(runner.recent())
+
+
+@app.route("/metrics")
+def metrics():
+
+    return Response(prometheus_text(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=10000)
@@ -0,0 +1,424 @@
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+# ─────────────────────────────────────────────────────────────
+# 로컬 상태 저장소 (SQLite, state.db)
+#
+# 흩어져 있던 JSON 상태 파일을 테이블 하나씩으로 통합
+#   shipments     : 배송건별 마지막 통관 단계 / 해시 / 조회·변경 시각   (구 unipass_status.json)
+#   step_history  : 배송건별로 처음 본 통관 단계 (단계, 처리 시각, 발견 시각)
+#   checkpoints   : 이름별 동기화 체크포인트 JSON                        (구 last_invoice.json)
+#   orders        : 노션에 저장한 ASAP 주문 링크 / 송장번호               (구 asap_order_index.json)
+#   fetch_meta    : URL 별 마지막 조회 결과 (상태코드, ETag, Last-Modified, 본문 해시, 판정 결과)
+#   captures      : URL → 저장해 둔 디버그 페이지 해시 (capture_store.py)
+#
+# 모든 조회는 기본키 / 인덱스로 → 10만 건 이상에서도 건당 조회·갱신 비용 일정
+# 쓰기는 연결 하나 + 잠금, commit() 때 한 번에 반영 (WAL)
+#
+# CI 실행 사이에는 JSONL 로 내보내서 저장소에 커밋 → 다음 실행에서 가져오기
+#   python state_store.py export FILE [--tables shipments,step_history]
+#   python state_store.py import FILE
+#   python state_store.py migrate        (기존 JSON 상태 파일 가져오기)
+#   FILE 이 .gz 로 끝나면 gzip 압축
+#
+# 환경변수:
+#   STATE_DB_FILE   - DB 파일 경로 (기본 state.db)
+# ─────────────────────────────────────────────────────────────
+
+STATE_DB = os.getenv("STATE_DB_FILE") or "state.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shipments (
+    key         TEXT PRIMARY KEY,
+    steps       TEXT NOT NULL,
+    hash        TEXT,
+    fetched_at  REAL,
+    changed_at  REAL,
+    unchanged   INTEGER NOT NULL DEFAULT 0,
+    bl_year     INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_shipments_fetched_at ON shipments(fetched_at);
+
+CREATE TABLE IF NOT EXISTS step_history (
+    key      TEXT NOT NULL,
+    step     TEXT NOT NULL,
+    time     TEXT NOT NULL,
+    seen_at  REAL,
+    PRIMARY KEY (key, step, time)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS checkpoints (
+    name        TEXT PRIMARY KEY,
+    data        TEXT NOT NULL,
+    updated_at  TEXT
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    link      TEXT PRIMARY KEY,
+    invoice   TEXT,
+    added_at  REAL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_invoice ON orders(invoice);
+
+CREATE TABLE IF NOT EXISTS fetch_meta (
+    url            TEXT PRIMARY KEY,
+    status         INTEGER,
+    etag           TEXT,
+    last_modified  TEXT,
+    content_hash   TEXT,
+    fetched_at     REAL,
+    result         TEXT
+);
+
+CREATE TABLE IF NOT EXISTS captures (
+    url          TEXT NOT NULL,
+    hash         TEXT NOT NULL,
+    kind         TEXT,
+    reason       TEXT,
+    size         INTEGER,
+    captured_at  REAL,
+    PRIMARY KEY (url, hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_captures_hash ON captures(hash);
+"""
+
+# 기존 DB 에 없으면 추가할 컬럼 (테이블, 컬럼, 타입)
+ADDED_COLUMNS = [
+    ("fetch_meta", "result", "TEXT"),
+]
+
+# 내보내기 / 가져오기 대상 (테이블 → 컬럼 순서)
+TABLES = {
+    "shipments": ("key", "steps", "hash", "fetched_at", "changed_at", "unchanged", "bl_year"),
+    "step_history": ("key", "step", "time", "seen_at"),
+    "checkpoints": ("name", "data", "updated_at"),
+    "orders": ("link", "invoice", "added_at"),
+    "fetch_meta": ("url", "status", "etag", "last_modified", "content_hash", "fetched_at", "result"),
+    "captures": ("url", "hash", "kind", "reason", "size", "captured_at"),
+}
+
+# 이전 버전이 쓰던 상태 파일 (migrate 로 한 번 가져옴)
+LEGACY_STATUS_FILE = "unipass_status.json"
+LEGACY_CHECKPOINT_FILE = "last_invoice.json"
+LEGACY_ORDER_INDEX_FILE = "asap_order_index.json"
+
+IMPORT_BATCH = 5000
+
+
+def _open(path, mode, compressed=None):
+    if compressed is None:
+        compressed = path.endswith(".gz")
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"[⚠️ 상태 파일 손상 → 건너뜀] {path}: {e}")
+        return None
+
+
+class StateStore:
+    def __init__(self, path=STATE_DB):
+        self.path = path
+        self.lock = threading.RLock()
+        # 스레드 풀 / 스케줄러 스레드에서 같이 쓰므로 연결 하나를 잠금으로 공유
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._add_columns()
+
+    def _add_columns(self):
+        for table, column, kind in ADDED_COLUMNS:
+            cols = {r[1] for r in self.conn.execute(f"PRAGMA table_info({table})")}
+            if column not in cols:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+        self.conn.commit()
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def _one(self, sql, args=()):
+        with self.lock:
+            return self.conn.execute(sql, args).fetchone()
+
+    # ── shipments ──
+    def shipment(self, key):
+        row = self._one("SELECT * FROM shipments WHERE key = ?", (key,))
+        if not row:
+            return None
+        entry = {
+            "steps": json.loads(row["steps"]),
+            "hash": row["hash"],
+            "fetched_at": row["fetched_at"],
+            "changed_at": row["changed_at"],
+            "unchanged": row["unchanged"],
+        }
+        if row["bl_year"]:
+            entry["bl_year"] = row["bl_year"]
+        return entry
+
+    def put_shipment(self, key, entry):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO shipments VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    json.dumps(entry.get("steps", []), ensure_ascii=False),
+                    entry.get("hash"),
+                    entry.get("fetched_at"),
+                    entry.get("changed_at"),
+                    entry.get("unchanged", 0),
+                    entry.get("bl_year"),
+                ),
+            )
+
+    def prune_shipments(self, before):
+        """before(epoch) 이전에 마지막으로 조회된 배송건과 그 이력 삭제, 삭제 건수 반환"""
+        with self.lock:
+            keys = [r[0] for r in self.conn.execute(
+                "SELECT key FROM shipments WHERE fetched_at < ?", (before,))]
+            self.conn.executemany("DELETE FROM step_history WHERE key = ?", [(k,) for k in keys])
+            self.conn.execute("DELETE FROM shipments WHERE fetched_at < ?", (before,))
+            return len(keys)
+
+    # ── step_history ──
+    def add_steps(self, key, steps, seen_at=None):
+        """처음 보는 단계만 이력에 추가, 새로 추가된 단계 목록 반환"""
+        seen_at = seen_at or time.time()
+        added = []
+        with self.lock:
+            for s in steps:
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO step_history VALUES (?, ?, ?, ?)",
+                    (key, s.get("step") or "", s.get("time") or "", seen_at),
+                )
+                if cur.rowcount:
+                    added.append(s)
+        return added
+
+    def step_history(self, key):
+        """배송건의 단계 이력 (처리 시각 순)"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT step, time, seen_at FROM step_history WHERE key = ? ORDER BY time, seen_at",
+                (key,),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    # ── checkpoints ──
+    def get_checkpoint(self, name):
+        row = self._one("SELECT data FROM checkpoints WHERE name = ?", (name,))
+        return json.loads(row["data"]) if row else None
+
+    def set_checkpoint(self, name, data):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?)",
+                (name, json.dumps(data, ensure_ascii=False), datetime.now().isoformat(timespec="seconds")),
+            )
+
+    # ── orders ──
+    def has_order(self, link, invoice=None):
+        if self._one("SELECT 1 FROM orders WHERE link = ?", (link,)):
+            return True
+        return bool(invoice and self._one("SELECT 1 FROM orders WHERE invoice = ?", (invoice,)))
+
+    def add_order(self, link, invoice=None):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO orders VALUES (?, ?, ?)",
+                (link, invoice, time.time()),
+            )
+
+    def replace_orders(self, rows):
+        """orders 테이블을 (link, invoice) 목록으로 통째로 교체"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("DELETE FROM orders")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO orders VALUES (?, ?, ?)",
+                ((link, invoice, now) for link, invoice in rows),
+            )
+
+    def count(self, table):
+        if table not in TABLES:
+            raise ValueError(f"unknown table: {table}")
+        return self._one(f"SELECT COUNT(*) FROM {table}")[0]
+
+    # ── fetch_meta ──
+    def fetch_meta(self, url):
+        row = self._one("SELECT * FROM fetch_meta WHERE url = ?", (url,))
+        return dict(row) if row else None
+
+    def record_fetch(self, url, status, etag=None, last_modified=None, content_hash=None, result=None):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fetch_meta "
+                "(url, status, etag, last_modified, content_hash, fetched_at, result) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, status, etag, last_modified, content_hash, time.time(), result),
+            )
+
+    # ── captures ──
+    def add_capture(self, url, content_hash, kind=None, reason=None, size=None):
+        """URL 에 저장한 페이지 해시 기록 (같은 URL·같은 내용이면 시각만 갱신)"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO captures (url, hash, kind, reason, size, captured_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, content_hash, kind, reason, size, time.time()),
+            )
+
+    def captures(self, url=None, limit=50):
+        """최근 저장 기록 (url 을 주면 그 URL 만)"""
+        sql = "SELECT * FROM captures"
+        args = ()
+        if url:
+            sql += " WHERE url = ?"
+            args = (url,)
+        with self.lock:
+            rows = self.conn.execute(sql + " ORDER BY captured_at DESC LIMIT ?", args + (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def drop_captures(self, hashes):
+        """파일이 지워진 해시의 기록 삭제"""
+        with self.lock:
+            self.conn.executemany("DELETE FROM captures WHERE hash = ?", [(h,) for h in hashes])
+
+    # ── 내보내기 / 가져오기 ──
+    def export(self, path, tables=None):
+        """테이블별 행을 JSONL 로 (키 순서 고정 → 실행 간 diff 최소화), 건수 반환"""
+        tables = tables or list(TABLES)
+        written = 0
+        tmp = f"{path}.tmp"
+        with self.lock, _open(tmp, "w", compressed=path.endswith(".gz")) as f:
+            self.conn.commit()
+            for table in tables:
+                cols = TABLES[table]
+                cur = self.conn.execute(f"SELECT {', '.join(cols)} FROM {table} ORDER BY {cols[0]}")
+                for row in cur:
+                    f.write(json.dumps({"table": table, "row": dict(zip(cols, row))}, ensure_ascii=False))
+                    f.write("\n")
+                    written += 1
+        os.replace(tmp, path)
+        return written
+
+    def import_(self, path):
+        """export 로 만든 파일 반영 (같은 키는 덮어씀), 건수 반환"""
+        batches = {}
+        read = 0
+
+        def flush(table):
+            rows = batches.pop(table, [])
+            if rows:
+                cols = TABLES[table]
+                marks = ", ".join("?" * len(cols))
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO {table} ({', '.join(cols)}) VALUES ({marks})", rows)
+
+        with self.lock, _open(path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                table = rec.get("table")
+                if table not in TABLES:
+                    continue
+                row = rec.get("row") or {}
+                batches.setdefault(table, []).append(tuple(row.get(c) for c in TABLES[table]))
+                read += 1
+                if len(batches[table]) >= IMPORT_BATCH:
+                    flush(table)
+            for table in list(batches):
+                flush(table)
+            self.conn.commit()
+        return read
+
+    def migrate_legacy(self):
+        """이전 JSON 상태 파일(있는 것만) 가져오기"""
+        status = _read_json(LEGACY_STATUS_FILE) or {}
+        for key, entry in status.items():
+            self.put_shipment(key, entry)
+
+        checkpoint = _read_json(LEGACY_CHECKPOINT_FILE)
+        if checkpoint:
+            self.set_checkpoint("asap", checkpoint)
+
+        from order_index import invoice_of
+
+        index = _read_json(LEGACY_ORDER_INDEX_FILE) or {}
+        for link in index.get("links", []):
+            self.add_order(link, invoice_of(link))
+
+        self.commit()
+        print(f"[📦 이전 상태 가져오기] 배송 {len(status)}건, "
+              f"체크포인트 {'있음' if checkpoint else '없음'}, 주문 {len(index.get('links', []))}건")
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=None):
+    """경로별 프로세스 공용 저장소"""
+    path = path or STATE_DB
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = StateStore(path)
+        return _stores[path]
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    tables = None
+    if "--tables" in args:
+        i = args.index("--tables")
+        tables = [t for t in args[i + 1].split(",") if t]
+        del args[i:i + 2]
+        unknown = [t for t in tables if t not in TABLES]
+        if unknown:
+            print("알 수 없는 테이블:", ", ".join(unknown))
+            sys.exit(2)
+
+    if not args or args[0] not in ("export", "import", "migrate") or \
+            (args[0] != "migrate" and len(args) != 2):
+        print("사용법: python state_store.py export FILE [--tables a,b] | import FILE | migrate")
+        sys.exit(2)
+
+    store = get_store()
+    cmd = args[0]
+
+    if cmd == "migrate":
+        store.migrate_legacy()
+    elif cmd == "export":
+        n = store.export(args[1], tables)
+        print(f"[💾 내보내기] {args[1]} ({n}행)")
+    else:
+        if not os.path.exists(args[1]):
+            print(f"[ℹ️ 가져올 파일 없음] {args[1]} → 빈 상태로 시작")
+            sys.exit(0)
+        n = store.import_(args[1])
+        print(f"[📥 가져오기] {args[1]} ({n}행)")
+
+    store.close()
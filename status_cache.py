@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import time
+
+from state_store import get_store
+
+# ─────────────────────────────────────────────────────────────
+# 배송건별 통관 단계 캐시 (state.db 의 shipments / step_history 테이블, 구 unipass_status.json)
+#
+# key  : asap:{통관부호}:{송장번호}  /  tradlinx:{BL번호}
+# value: 마지막으로 본 단계 목록, 내용 해시, 조회 시각, 단계가 마지막으로 바뀐 시각,
+#        연속으로 변화 없던 횟수, (Tradlinx) 조회에 성공한 BL 연도
+#
+# 조회할 때마다 이전 단계와 비교해 처음 나타난 단계를 step_history 에 쌓고 돌려줌
+#   → 호출 쪽은 새 단계가 있을 때만 Notion 에 씀
+# 최근에 조회했고 단계가 그대로인 건은 다시 스크래핑하지 않고 캐시된 단계를 사용
+# 변화 없는 횟수가 늘어날수록 재조회 간격도 늘어남 (UNIPASS_CACHE_TTL × 2ⁿ, 최대 UNIPASS_CACHE_MAX_TTL)
+# 단, 입항 이후 단계에 있는 건은 단계별 간격(STAGE_INTERVALS, poll_scheduler 와 공용)을 넘겨 미루지 않음
+#   → 심사완료 직전 건이 하루 이상 캐시에 묶여 있지 않도록
+#
+# 환경변수:
+#   UNIPASS_CACHE_TTL       - 기본 재조회 간격(시간, 기본 6)
+#   UNIPASS_CACHE_MAX_TTL   - 재조회 간격 상한(시간, 기본 48)
+#   UNIPASS_FORCE           - 1 이면 캐시 무시하고 전부 조회
+#   (저장 위치는 state_store.STATE_DB_FILE)
+# ─────────────────────────────────────────────────────────────
+
+CACHE_TTL = float(os.getenv("UNIPASS_CACHE_TTL") or 6) * 3600
+CACHE_MAX_TTL = float(os.getenv("UNIPASS_CACHE_MAX_TTL") or 48) * 3600
+FORCE = os.getenv("UNIPASS_FORCE") == "1"
+
+# (단계 이름에 포함된 문자열, 다음 조회까지 기본 간격(분)) — 심사완료에 가까운 순
+STAGE_INTERVALS = [
+    ("통관목록접수", 20),
+    ("반입신고", 30),
+    ("하선신고", 60),
+    ("하기신고", 60),
+    ("입항", 120),
+    ("적하목록", 180),
+]
+NO_STEP_INTERVAL = 360        # 단계 없음 (아직 중국 내)
+UNKNOWN_STEP_INTERVAL = 120   # 모르는 단계만 있음
+
+
+def base_interval(steps):
+    """단계 목록 중 가장 진행된 단계 기준 기본 간격(초)"""
+    if not steps:
+        return NO_STEP_INTERVAL * 60
+
+    best = None
+    for s in steps:
+        name = (s.get("step") or "").replace(" ", "")
+        for needle, minutes in STAGE_INTERVALS:
+            if needle in name:
+                best = minutes if best is None else min(best, minutes)
+                break
+
+    return (best or UNKNOWN_STEP_INTERVAL) * 60
+
+
+# 이 기간 동안 한 번도 조회되지 않은 항목은 저장 시 정리 (통관 완료 등으로 대상에서 빠진 건)
+PRUNE_AFTER = 90 * 24 * 3600
+
+
+def cache_key(item):
+    if item.get("type") == "asap":
+        return f"asap:{item['code']}:{item['invoice']}"
+    if item.get("type") == "tradlinx":
+        return f"tradlinx:{item['bl_no']}"
+    return None
+
+
+def steps_hash(steps):
+    raw = json.dumps(steps, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class StatusCache:
+    def __init__(self, store=None):
+        self.store = store or get_store()
+
+    def save(self):
+        self.store.prune_shipments(time.time() - PRUNE_AFTER)
+        self.store.commit()
+
+    def get(self, key):
+        return self.store.shipment(key)
+
+    def ttl(self, entry):
+        ttl = min(CACHE_MAX_TTL, CACHE_TTL * (2 ** entry.get("unchanged", 0)))
+        stage = base_interval(entry.get("steps", []))
+        if stage < NO_STEP_INTERVAL * 60:
+            ttl = min(ttl, stage)   # 입항 이후 → 단계별 간격이 상한
+        return ttl
+
+    def fresh_steps(self, key, now=None):
+        """재조회 간격 안이면 캐시된 단계 목록, 아니면 None"""
+        entry = self.get(key)
+        if not entry:
+            return None
+        now = now or time.time()
+        if now - entry.get("fetched_at", 0) >= self.ttl(entry):
+            return None
+        return entry.get("steps", [])
+
+    def record(self, key, steps, now=None, bl_year=None):
+        """
+        새로 조회한 단계 저장 후 이전 조회와 비교
+        반환: 이번에 처음 나타난 단계 목록 (변화 없으면 [])
+        """
+        now = now or time.time()
+        digest = steps_hash(steps)
+        with self.store.lock:
+            prev = self.store.shipment(key) or {}
+            changed = prev.get("hash") != digest
+            entry = {
+                "steps": steps,
+                "hash": digest,
+                "fetched_at": now,
+                "changed_at": now if changed else prev.get("changed_at", now),
+                "unchanged": 0 if changed else prev.get("unchanged", 0) + 1,
+                "bl_year": bl_year or prev.get("bl_year"),
+            }
+            self.store.put_shipment(key, entry)
+            return self.store.add_steps(key, steps, now) if changed else []
+
+    def attach_hints(self, item):
+        """스크래핑에 도움이 되는 기억값(BL 연도)을 item 에 넣어둠"""
+        entry = self.get(cache_key(item))
+        if entry and entry.get("bl_year"):
+            item.setdefault("bl_year", entry["bl_year"])
+
+    def attach_cached(self, item, force=FORCE):
+        """
+        최근 조회 결과가 있으면 item["cached_steps"] 에 넣어둠 → 조회 함수는 스크래핑 생략
+        캐시를 쓴 경우 True
+        """
+        self.attach_hints(item)
+        if force:
+            return False
+        key = cache_key(item)
+        steps = self.fresh_steps(key) if key else None
+        if steps is None:
+            return False
+        item["cached_steps"] = steps
+        return True
+
+    def update_from(self, item, steps):
+        """조회 결과 반영, 새로 나타난 단계 목록 반환 (캐시에서 꺼낸 결과면 그대로 두고 [])"""
+        if "cached_steps" in item or steps is None:
+            return []
+        key = cache_key(item)
+        return self.record(key, steps, bl_year=item.get("bl_year")) if key else []
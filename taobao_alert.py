@@ -1,52 +1,37 @@
 import os
-import requests
-from bs4 import BeautifulSoup
+import time
 from urllib.parse import urlparse, parse_qs
 from notion_client import Client
-import smtplib
-from email.message import EmailMessage
 from dotenv import load_dotenv
 
+from taobao_check import check_products, check_url, in_stock_skus, iter_products, RESTOCKED, BLOCKED
+from jobs import progress
+from metrics import dump_summary, record_run
+from notifier import flush_notifications, notify
+
 # 📦 환경변수 로드
 load_dotenv()
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
-NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
-EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
-EMAIL_NAME = os.getenv("EMAIL_NAME") or "재입고 알리미"
-TO_EMAIL = os.getenv("TO_EMAIL") or EMAIL_ADDRESS
 
 # 📌 Notion 클라이언트
 notion = Client(auth=NOTION_TOKEN)
 
-# 🔍 상품 재입고 여부 확인 함수
+# 🔍 상품 재입고 여부 확인 함수 (차단 / 요청 실패는 재입고 아님)
 def is_restocked(url):
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        res = requests.get(url, headers=headers, timeout=10)
-        res.raise_for_status()
-        soup = BeautifulSoup(res.text, "html.parser")
+    result = check_url(url)
+    if result["state"] == BLOCKED:
+        print(f"[⚠️ 차단 / 요청 실패] {url}: {result['reason']}")
+    return result["state"] == RESTOCKED
 
-        sold_out_tag = soup.find("div", class_="sold-out") or soup.find(string=lambda t: "품절" in t)
-        return sold_out_tag is None
-    except Exception as e:
-        print(f"[⚠️ 요청 실패] {url}: {e}")
-        return False
-
-# 🗃️ Notion 상품 링크 가져오기
+# 🗃️ Notion 상품 링크 가져오기 (100건 넘어도 끝까지, 받아오는 대로 확인하려면 iter_products)
 def get_product_links():
-    items = []
-    try:
-        res = notion.databases.query(database_id=NOTION_DATABASE_ID)
-        for result in res["results"]:
-            title_prop = result["properties"].get("상품 링크", {})
-            if title_prop.get("title"):
-                title_text = title_prop["title"][0].get("plain_text", "")
-                if title_text:
-                    items.append((title_text, result["id"]))
-    except Exception as e:
-        print(f"[⚠️ Notion 불러오기 실패] {e}")
-    return items
+    return [(it["url"], it["page_id"]) for it in iter_products()]
+
+
+def _loaded(items):
+    for it in items:
+        progress("loaded")
+        yield it
 
 # 🧹 Notion에서 항목 삭제
 
@@ -56,46 +41,53 @@ def delete_notion_page(page_id):
     except Exception as e:
         print(f"[⚠️ Notion 삭제 실패] {page_id}: {e}")
 
-# 📧 메일 전송
-
-def send_email(restocked_links):
-    subject = "[🔔 재입고 알림] 타오바오 상품 구매 가능"
-    body = "다음 상품이 다시 구매 가능해졌습니다:\n\n"
-    for link in restocked_links:
-        body += f"- 상품 링크: {link}\n"
-
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = f"{EMAIL_NAME} <{EMAIL_ADDRESS}>"
-    msg["To"] = TO_EMAIL
-    msg.set_content(body)
-
-    try:
-        with smtplib.SMTP_SSL("smtp.naver.com", 465) as smtp:
-            smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            smtp.send_message(msg)
-        print("[📧 메일 전송 완료]")
-    except Exception as e:
-        print(f"[⚠️ 메일 전송 실패] {e}")
-
 # ✅ 메인 로직
 
 def main():
     print("[🚀 타오바오 재입고 알림 시스템 시작]")
-    links = get_product_links()
+    started = time.perf_counter()
     restocked = []
+    blocked = []
+    checked = 0
 
-    for url, page_id in links:
-        print(f"[🔍 확인 중] {url}")
-        if is_restocked(url):
-            restocked.append(url)
-            delete_notion_page(page_id)
-            print(f"[✅ 재입고 확인 및 삭제] {url}")
+    # Notion 에서 페이지(100건)가 오는 대로 동시에 확인, 차단된 상품은 잠시 뒤 그 상품만 재확인
+    try:
+        for it, result in check_products(_loaded(iter_products())):
+            url = it["url"]
+            state = result["state"]
+            checked += 1
+            progress("checked")
+            progress(state)
+
+            if state == RESTOCKED:
+                # 재고 있는 옵션이 확인되면 메일에 같이 표시
+                variants = in_stock_skus(result["item"])
+                line = f"{url} ({', '.join(variants)})" if variants else url
+                restocked.append(line)
+                # 메일은 알림 큐가 모아서 보냄 (확인은 기다리지 않고 계속)
+                notify("restock", f"상품 링크: {line}", key=url)
+                delete_notion_page(it["page_id"])
+                print(f"[✅ 재입고 확인 및 삭제] {url}")
+                for v in variants:
+                    print(f"  └ {v}")
+            elif state == BLOCKED:
+                blocked.append(url)
+                print(f"[⛔ 차단 / 확인 실패] {url}: {result['reason']}")
+            else:
+                print(f"[🔍 품절{' (변경 없음)' if result['cached'] else ''}] {url}")
+    except Exception as e:
+        # 목록을 받다가 끊겨도 이미 확인한 재입고는 메일로 보냄
+        print(f"[⚠️ Notion 불러오기 실패] {e}")
 
-    if restocked:
-        send_email(restocked)
-    else:
+    if blocked:
+        print(f"[⚠️ 확인 못 한 상품 {len(blocked)}건] 다음 실행에서 다시 확인")
+
+    if not restocked:
         print("[ℹ️ 재입고 없음] 메일 생략")
 
+    record_run("taobao", checked, time.perf_counter() - started)
+
 if __name__ == "__main__":
     main()
+    flush_notifications()
+    dump_summary()
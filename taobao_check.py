@@ -0,0 +1,322 @@
+import hashlib
+import itertools
+import os
+import threading
+import time
+
+import requests
+from bs4 import BeautifulSoup
+
+import http_client
+from capture_store import capture
+from check_pool import run_checks
+from host_guard import HostGuard
+from html_parsing import parse_taobao_item
+from notion_api import query_database
+from state_store import get_store
+
+# ─────────────────────────────────────────────────────────────
+# 타오바오 상품 재고 확인 (taobao_alert / taobao_stock_check 공용)
+#
+# 결과는 세 가지: restocked(구매 가능) / sold_out(품절) / blocked(로그인·캡차·요청 실패)
+#   → blocked 는 "품절"로 취급하지 않고 잠시 뒤 그 상품만 다시 확인
+# 재고 판정은 페이지에 박힌 __ICE_APP_CONTEXT__ JSON 의 SKU별 수량 기준
+#   (컨텍스트가 없거나 못 읽은 페이지는 DOM 에 품절 표시가 있을 때만 품절,
+#    그 밖에는 재입고로 판정하지 않고 blocked + 페이지 저장 → 잘못된 재입고 알림 / 삭제 방지)
+#
+# - 상품 목록: Notion 상품 DB 를 페이지(100건) 단위로 받아오는 대로 바로 확인 (iter_products)
+# - 동시 확인: check_pool (taobao.com 동시 요청은 TAOBAO_CONCURRENCY 로 제한)
+# - 조건부 요청: 지난번 ETag / Last-Modified 를 보내고 304 면 지난 판정 재사용
+#   200 이어도 본문 해시가 같으면 다시 파싱하지 않음 (state.db fetch_meta)
+# - 차단 대응: host_guard.HostGuard 로 요청 간격 자동 조절 + 연속 차단 시 서킷 브레이커
+#   쿠키가 여러 개면 돌아가며 쓰고, 차단된 쿠키는 쿨다운 동안 빼둠
+#   실행 끝에 차단율 / 처리량 출력 (report_run)
+#
+# 환경변수:
+#   TAOBAO_NOTION_DB_ID       - 상품 DB (없으면 NOTION_DATABASE_ID)
+#   TAOBAO_COOKIE             - 로그인 쿠키 (있으면 요청에 포함, 여러 개는 줄바꿈 또는 "||" 로 구분)
+#   TAOBAO_BLOCK_RETRIES      - 차단된 상품 재확인 횟수 (기본 2)
+#   TAOBAO_BLOCK_RETRY_DELAY  - 재확인 전 대기(초, 기본 30)
+#   TAOBAO_MIN_INTERVAL       - 요청 간 최소 간격(초, 기본 0.5) / TAOBAO_MAX_INTERVAL 차단 시 상한(기본 30)
+#   TAOBAO_BREAKER_THRESHOLD  - 연속 차단 몇 번에 요청 중단할지 (기본 3)
+#   TAOBAO_BREAKER_COOLDOWN   - 요청 중단 시간(초, 기본 120, 차단된 쿠키도 이 시간 동안 제외)
+#   TAOBAO_BREAKER_MAX_TRIPS  - 한 실행에서 이만큼 중단되면 남은 상품은 확인하지 않음 (기본 3)
+# ─────────────────────────────────────────────────────────────
+
+RESTOCKED = "restocked"
+SOLD_OUT = "sold_out"
+BLOCKED = "blocked"
+
+HEADERS = {
+    "user-agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,ko;q=0.7",
+    "referer": "https://www.taobao.com/",
+}
+
+TAOBAO_COOKIE = os.getenv("TAOBAO_COOKIE")
+TAOBAO_COOKIES = [c.strip() for c in (TAOBAO_COOKIE or "").replace("||", "\n").splitlines() if c.strip()]
+if TAOBAO_COOKIES:
+    HEADERS["cookie"] = TAOBAO_COOKIES[0]
+
+BLOCK_SIGNALS = [
+    "login.taobao.com",
+    "sec.taobao.com",
+    "verify",
+    "验证码",
+    "滑块",
+    "访问受限",
+    "请登录",
+    "安全验证",
+]
+
+# 차단 시 넘어가는 주소
+BLOCK_HOSTS = ("login.taobao.com", "sec.taobao.com")
+
+TAOBAO_NOTION_DB_ID = os.getenv("TAOBAO_NOTION_DB_ID") or os.getenv("NOTION_DATABASE_ID")
+PRODUCT_LINK_PROPERTY = "상품 링크"
+PRODUCT_FILTER = {"property": PRODUCT_LINK_PROPERTY, "title": {"is_not_empty": True}}
+
+BLOCK_RETRIES = int(os.getenv("TAOBAO_BLOCK_RETRIES") or 2)
+BLOCK_RETRY_DELAY = float(os.getenv("TAOBAO_BLOCK_RETRY_DELAY") or 30)
+
+BREAKER_COOLDOWN = float(os.getenv("TAOBAO_BREAKER_COOLDOWN") or 120)
+
+guard = HostGuard(
+    "taobao.com",
+    min_interval=float(os.getenv("TAOBAO_MIN_INTERVAL") or 0.5),
+    max_interval=float(os.getenv("TAOBAO_MAX_INTERVAL") or 30),
+    threshold=int(os.getenv("TAOBAO_BREAKER_THRESHOLD") or 3),
+    cooldown=BREAKER_COOLDOWN,
+    max_trips=int(os.getenv("TAOBAO_BREAKER_MAX_TRIPS") or 3),
+)
+
+
+class CookiePool:
+    """쿠키 여러 개를 돌아가며 사용, 차단된 쿠키는 cooldown 동안 제외"""
+
+    def __init__(self, cookies, cooldown=BREAKER_COOLDOWN):
+        self.cookies = list(cookies)
+        self.cooldown = cooldown
+        self.benched = {}                          # 쿠키 → 다시 쓸 수 있는 시각
+        self.blocks = {c: 0 for c in self.cookies}
+        self.cycle = itertools.cycle(self.cookies)
+        self.lock = threading.Lock()
+
+    def next(self):
+        """다음 쿠키 (없으면 None, 전부 빠져 있으면 가장 먼저 풀리는 쿠키)"""
+        if not self.cookies:
+            return None
+        with self.lock:
+            now = time.time()
+            for _ in range(len(self.cookies)):
+                cookie = next(self.cycle)
+                if self.benched.get(cookie, 0) <= now:
+                    return cookie
+            return min(self.cookies, key=lambda c: self.benched.get(c, 0))
+
+    def bench(self, cookie):
+        if cookie is None:
+            return
+        with self.lock:
+            self.blocks[cookie] += 1
+            self.benched[cookie] = time.time() + self.cooldown
+        if len(self.cookies) > 1:
+            print(f"[🍪 쿠키 #{self.cookies.index(cookie) + 1} 차단 → {self.cooldown:g}초 동안 제외]")
+
+    def report(self):
+        with self.lock:
+            return {f"#{i + 1}": self.blocks[c] for i, c in enumerate(self.cookies)}
+
+
+cookies = CookiePool(TAOBAO_COOKIES)
+
+
+def is_blocked(html: str) -> list[str]:
+    return [s for s in BLOCK_SIGNALS if s in html]
+
+
+def legacy_is_sold_out(html):
+    soup = BeautifulSoup(html, "html.parser")
+    return bool(soup.find("div", class_="sold-out") or soup.find(string=lambda t: "품절" in t))
+
+
+def block_reason(resp, html):
+    """차단 페이지면 이유, 아니면 None (상품 데이터가 있으면 로그인 링크가 있어도 정상 페이지)"""
+    if any(h in (resp.url or "") for h in BLOCK_HOSTS):
+        return f"redirect → {resp.url}"
+    if "__ICE_APP_CONTEXT__" in html:
+        return None
+    hits = is_blocked(html)
+    return ", ".join(hits) if hits else None
+
+
+def iter_products(database_id=None):
+    """
+    Notion 상품 DB 의 {"url", "page_id"} 를 페이지 단위로 받아오며 바로 yield
+    (next_cursor 로 끝까지, 링크가 빈 행은 Notion 쪽 필터로 제외)
+    """
+    database_id = database_id or TAOBAO_NOTION_DB_ID
+    if not database_id:
+        print("[⚠️ TAOBAO_NOTION_DB_ID 없음 → 상품 목록 없음]")
+        return
+    for result in query_database(database_id, filter=PRODUCT_FILTER, properties=[PRODUCT_LINK_PROPERTY]):
+        title = result["properties"].get(PRODUCT_LINK_PROPERTY, {}).get("title") or []
+        url = title[0].get("plain_text", "").strip() if title else ""
+        if url:
+            yield {"url": url, "page_id": result["id"]}
+
+
+def in_stock_skus(item):
+    """재고 있는 옵션 요약 (예: "黑色/M 3개 ¥89.00")"""
+    lines = []
+    for sku in (item or {}).get("skus", []):
+        if sku["quantity"] > 0:
+            label = "/".join(sku["props"].values()) or sku["sku_id"]
+            price = f" ¥{sku['price']}" if sku.get("price") else ""
+            lines.append(f"{label} {sku['quantity']}개{price}")
+    return lines
+
+
+def check_url(url, store=None):
+    """
+    상품 하나 확인 → {"url", "state", "reason", "cached", "item"}
+    item: html_parsing.parse_taobao_item 결과 (SKU별 재고 / 가격, 새로 파싱한 경우만)
+    """
+    store = store or get_store()
+    meta = store.fetch_meta(url) or {}
+    reusable = meta.get("result") in (RESTOCKED, SOLD_OUT)
+
+    headers = dict(HEADERS)
+    cookie = cookies.next()
+    if cookie:
+        headers["cookie"] = cookie
+    if reusable and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if reusable and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    result = {"url": url, "state": BLOCKED, "reason": None, "cached": False, "item": None}
+
+    # 서킷이 열려 있으면 풀릴 때까지 대기, 이번 실행에서 포기했으면 요청하지 않음
+    if not guard.acquire():
+        result["reason"] = "연속 차단으로 확인 중단"
+        return result
+
+    # 재시도는 http_client 가 아니라 guard 가 결정 (429 / 5xx 도 바로 받아서 차단 판정에 반영)
+    try:
+        resp = http_client.get(url, headers=headers, timeout=15, retries=0)
+    except requests.RequestException as e:
+        result["reason"] = f"요청 실패: {e}"
+        return result
+
+    # 변경 없음 → 지난 판정 그대로
+    if resp.status_code == 304 and reusable:
+        store.record_fetch(url, 304, meta.get("etag"), meta.get("last_modified"),
+                           meta.get("content_hash"), meta["result"])
+        guard.record(blocked=False)
+        result.update(state=meta["result"], cached=True)
+        return result
+
+    if resp.status_code != 200:
+        result["reason"] = f"HTTP {resp.status_code}"
+        store.record_fetch(url, resp.status_code, result=BLOCKED)
+        # 403 / 429 는 차단으로 보고 속도를 늦춤 (그 밖의 오류는 판정에 반영하지 않음)
+        if resp.status_code in (403, 429):
+            guard.record(blocked=True)
+            cookies.bench(cookie)
+        return result
+
+    html = resp.text
+    digest = hashlib.sha1(html.encode("utf-8")).hexdigest()
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+
+    if reusable and digest == meta.get("content_hash"):
+        result.update(state=meta["result"], cached=True)
+    else:
+        reason = block_reason(resp, html)
+        if reason:
+            result["reason"] = reason
+            store.record_fetch(url, 200, result=BLOCKED)
+            guard.record(blocked=True)
+            cookies.bench(cookie)
+            return result
+        item = parse_taobao_item(html)
+        if item is not None:
+            result["item"] = item
+            result["state"] = RESTOCKED if item["in_stock"] else SOLD_OUT
+        elif legacy_is_sold_out(html):
+            result["state"] = SOLD_OUT
+        else:
+            # 상품 데이터를 못 찾음 → 재고를 알 수 없음 (모르는 차단 페이지 / 구조 변경 의심), 페이지 저장
+            if "__ICE_APP_CONTEXT__" in html:
+                result["reason"] = "상품 컨텍스트 파싱 실패"
+                capture(url, html, kind="taobao", reason="context parse failed")
+            else:
+                result["reason"] = "상품 데이터 없음"
+                capture(url, html, kind="taobao", reason="no item context")
+            store.record_fetch(url, 200, result=BLOCKED)
+            guard.record(blocked=True)
+            return result
+
+    store.record_fetch(url, 200, etag, last_modified, digest, result["state"])
+    guard.record(blocked=False)
+    return result
+
+
+def _check_item(it):
+    return check_url(it["url"])
+
+
+def check_products(items, workers=None, retries=BLOCK_RETRIES, retry_delay=BLOCK_RETRY_DELAY):
+    """
+    items: {"url": ..., (그 밖의 값은 그대로 전달)} — 제너레이터여도 됨
+    (item, result) 를 yield. 판정이 난 건은 바로, 차단된 건은 재확인이 끝난 뒤
+    끝나면 차단율 / 처리량 출력 (report_run)
+    """
+    guard.start_run()
+    blocked = []
+
+    for it, result in run_checks((dict(it, type="taobao") for it in items), _check_item, workers=workers):
+        if result is None:
+            result = {"url": it["url"], "state": BLOCKED, "reason": "확인 실패", "cached": False, "item": None}
+        if result["state"] == BLOCKED:
+            blocked.append((it, result))
+        else:
+            yield it, result
+
+    for attempt in range(1, retries + 1):
+        if not blocked or guard.trips >= guard.max_trips:
+            break
+        print(f"[⏳ 차단 {len(blocked)}건 → {retry_delay:g}초 후 재확인 {attempt}/{retries}]")
+        time.sleep(retry_delay)
+
+        retry, blocked = blocked, []
+        for it, result in run_checks([it for it, _ in retry], _check_item, workers=workers):
+            if result is None:
+                result = {"url": it["url"], "state": BLOCKED, "reason": "확인 실패", "cached": False, "item": None}
+            if result["state"] == BLOCKED:
+                blocked.append((it, result))
+            else:
+                yield it, result
+
+    yield from blocked
+    get_store().commit()
+    report_run()
+
+
+def report_run():
+    """이번 실행의 차단율 / 처리량 출력 → dict"""
+    report = guard.report()
+    if len(cookies.cookies) > 1:
+        report["cookie_blocks"] = cookies.report()
+    print(
+        f"[📈 타오바오 요청 {report['requests']}건 / 차단 {report['blocked']}건 "
+        f"({report['block_rate'] * 100:.1f}%) / 처리량 {report['throughput']}건/s / "
+        f"간격 {report['interval']}s / 서킷 {report['circuit_trips']}회 / 미확인 {report['skipped']}건]"
+    )
+    return report
@@ -1,39 +1,19 @@
-import os
 import re
-import requests
-from datetime import datetime
+import sys
 from urllib.parse import urlparse, parse_qs
 
+import http_client
+from capture_store import capture
+from metrics import dump_summary
+from html_parsing import parse_taobao_item
+from taobao_check import (  # noqa: F401
+    HEADERS, BLOCK_SIGNALS, block_reason, cookies, guard, is_blocked, iter_products, report_run,
+)
+
 # =====================
-# 기본 설정
+# 기본 설정 (헤더 / 쿠키 / 차단 신호 / 속도 조절은 taobao_check 와 공용)
+# 실패한 페이지는 capture_store 에 저장 (같은 내용은 한 번만, 압축, 보관 한도 적용)
 # =====================
-HEADERS = {
-    "user-agent": (
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/120.0.0.0 Safari/537.36"
-    ),
-    "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,ko;q=0.7",
-    "referer": "https://www.taobao.com/",
-}
-
-TAOBAO_COOKIE = os.getenv("TAOBAO_COOKIE")
-if TAOBAO_COOKIE:
-    HEADERS["cookie"] = TAOBAO_COOKIE
-
-DEBUG_DIR = "debug_html"
-os.makedirs(DEBUG_DIR, exist_ok=True)
-
-BLOCK_SIGNALS = [
-    "login.taobao.com",
-    "sec.taobao.com",
-    "verify",
-    "验证码",
-    "滑块",
-    "访问受限",
-    "请登录",
-    "安全验证",
-]
 
 # =====================
 # 유틸
@@ -46,16 +26,21 @@ def extract_item_id(url: str) -> str | None:
     return None
 
 
-def is_blocked(html: str) -> list[str]:
-    return [s for s in BLOCK_SIGNALS if s in html]
-
-
 # =====================
 # 메인 fetch + 디버깅
 # =====================
 def fetch_and_debug(url: str, index: int):
     print(f"\n[FETCH] {url}")
-    resp = requests.get(url, headers=HEADERS, timeout=15)
+    if not guard.acquire():
+        print("[DEBUG] 연속 차단으로 요청 중단")
+        return False, ["circuit open"]
+
+    headers = dict(HEADERS)
+    cookie = cookies.next()
+    if cookie:
+        headers["cookie"] = cookie
+    # 재시도 없이 한 번만 (차단 응답은 바로 guard 에 반영)
+    resp = http_client.get(url, headers=headers, timeout=15, retries=0)
 
     print(f"[DEBUG] status_code = {resp.status_code}")
     print(f"[DEBUG] final_url  = {resp.url}")
@@ -70,17 +55,30 @@ def fetch_and_debug(url: str, index: int):
     hits = is_blocked(html)
     print(f"[DEBUG] block_signals = {hits}")
 
+    blocked = resp.status_code in (403, 429) or block_reason(resp, html) is not None
+    guard.record(blocked=blocked)
+    if blocked:
+        cookies.bench(cookie)
+
     # 3️⃣ ICE_APP_CONTEXT 존재 여부
     has_ctx = "__ICE_APP_CONTEXT__" in html
     print(f"[DEBUG] has_ICE_APP_CONTEXT = {has_ctx}")
 
     # 4️⃣ 실패 시 HTML 저장
     if not has_ctx:
-        ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        path = f"{DEBUG_DIR}/taobao_{index}_{ts}.html"
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(html)
-        print(f"[DEBUG] saved html → {path}")
+        content_hash = capture(url, html, kind="taobao", reason="block" if blocked else "no context")
+        print(f"[DEBUG] saved html → {content_hash[:16]} (python capture_store.py show {content_hash[:16]})")
+
+    # 5️⃣ 컨텍스트에서 SKU별 재고 / 가격
+    item = parse_taobao_item(html) if has_ctx else None
+    if item:
+        print(f"[DEBUG] item = {item['item_id']} / {item['title']} / 전체 {item['total_quantity']}개")
+        for sku in item["skus"]:
+            label = "/".join(sku["props"].values()) or sku["sku_id"]
+            print(f"[DEBUG]   {label}: {sku['quantity']}개 ({sku['quantity_text']}) ¥{sku['price']}")
+    elif has_ctx:
+        content_hash = capture(url, html, kind="taobao", reason="context parse failed")
+        print(f"[DEBUG] ICE_APP_CONTEXT 파싱 실패 (구조 변경 가능) → {content_hash[:16]}")
 
     return has_ctx, hits
 
@@ -89,14 +87,17 @@ def fetch_and_debug(url: str, index: int):
 # 실행부
 # =====================
 def main():
-    urls = [
-        "https://item.taobao.com/item.htm?id=968090853112",
-        "https://item.taobao.com/item.htm?id=948568525004",
-    ]
+    # 인자로 URL 을 주면 그것만, 없으면 Notion 상품 DB(TAOBAO_NOTION_DB_ID)를 받아오는 대로 확인
+    if len(sys.argv) > 1:
+        urls = iter(sys.argv[1:])
+    else:
+        urls = (it["url"] for it in iter_products())
 
-    print(f"[INFO] pages loaded: {len(urls)}")
+    guard.start_run()
+    count = 0
 
     for i, url in enumerate(urls, 1):
+        count = i
         ok, signals = fetch_and_debug(url, i)
 
         if not ok:
@@ -107,6 +108,10 @@ def main():
         else:
             print("[RESULT] ✅ ICE_APP_CONTEXT 존재 (파싱 가능 상태)")
 
+    print(f"[INFO] pages checked: {count}")
+    report_run()
+
 
 if __name__ == "__main__":
     main()
+    dump_summary()
@@ -1,20 +1,31 @@
 import os
 import re
-import requests
-from bs4 import BeautifulSoup
+import time
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime
 
+import requests
+
+import http_client
+from check_pool import run_checks
+from jobs import progress
+from metrics import dump_summary, record_run
+from capture_store import capture
+from html_parsing import parse_asap_steps, parse_failed, parse_tradlinx_steps
+from notion_api import query_database
+from notion_writer import get_writer, flush_and_report
+from notifier import flush_notifications, notify
+from status_cache import StatusCache
+
 # 📌 Notion 환경변수
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 
-# 📌 Notion 공통 헤더
-NOTION_HEADERS = {
-    "Authorization": f"Bearer {NOTION_TOKEN}",
-    "Notion-Version": "2022-06-28",
-    "Content-Type": "application/json",
-}
+# 📌 (선택) 최근 통관 단계 / 처리 시각을 기록할 속성 이름 (rich_text / date), 없으면 Status 만
+NOTION_STEP_PROPERTY = os.getenv("NOTION_STEP_PROPERTY")
+NOTION_STEP_TIME_PROPERTY = os.getenv("NOTION_STEP_TIME_PROPERTY")
+
+CLEARED_STEP = "통관목록심사완료"
 
 # 📌 공통 User-Agent
 UA_HEADERS = {
@@ -28,188 +39,301 @@ def is_probably_number(s: str) -> bool:
     return bool(re.fullmatch(r"\d{8,30}", s.strip()))
 
 
-def get_tracking_items():
-    url = f"https://api.notion.com/v1/databases/{NOTION_DATABASE_ID}/query"
-    response = requests.post(url, headers=NOTION_HEADERS, json={})
-
-    print("[DEBUG] Notion status:", response.status_code)
-    try:
-        data = response.json()
-    except Exception as e:
-        print("[DEBUG] Notion 응답 JSON 파싱 실패:", e, response.text)
-        return []
-
-    if "results" not in data:
-        print("[DEBUG] Notion 응답에 'results' 키가 없음. 전체 응답:")
-        print(data)
-        return []
-
-    items = []
-    for result in data["results"]:
-        props = result["properties"]
-
-        # ✅ 'Not started' 상태인 항목만 검사
-        status = props.get("Status", {}).get("status") or {}
-        if status.get("name") != "Not started":
-            print(f"[⏭️ 스킵] Status: {status.get('name', '없음')}")
-            continue
+# 📌 조회 대상 필터 / 필요한 속성만 요청
+NOT_STARTED_FILTER = {"property": "Status", "status": {"equals": "Not started"}}
+TRACKING_PROPERTIES = ["조회링크", "성함"]
 
-        full_url = props.get("조회링크", {}).get("url", "") or ""
-        name = props.get("성함", {}).get("rich_text", [])
-        name_text = name[0]["plain_text"] if name else ""
-        page_id = result["id"]
-
-        raw = (full_url or "").strip()
-
-        if raw.startswith("http"):
-            parsed_url = urlparse(raw)
-            query_params = parse_qs(parsed_url.query)
-            customs_code = query_params.get("code", [""])[0]
-            invoice_no = query_params.get("invoice", [""])[0]
-
-            if customs_code and invoice_no:
-                items.append({
-                    "type": "asap",
-                    "code": customs_code,
-                    "invoice": invoice_no,
-                    "page_id": page_id,
-                    "name": name_text,
-                    "raw": raw,
-                })
-            else:
-                items.append({
-                    "type": "unknown",
-                    "page_id": page_id,
-                    "name": name_text,
-                    "raw": raw,
-                })
-
-        elif is_probably_number(raw):
-            items.append({
-                "type": "tradlinx",
-                "bl_no": raw,
-                "page_id": page_id,
-                "name": name_text,
-                "raw": raw,
-            })
 
-        else:
-            items.append({
-                "type": "unknown",
+def parse_tracking_item(result):
+    """Notion 페이지 → 조회 항목 (asap / tradlinx / unknown)"""
+    props = result["properties"]
+
+    full_url = props.get("조회링크", {}).get("url", "") or ""
+    name = props.get("성함", {}).get("rich_text", [])
+    name_text = name[0]["plain_text"] if name else ""
+    page_id = result["id"]
+
+    raw = (full_url or "").strip()
+
+    if raw.startswith("http"):
+        parsed_url = urlparse(raw)
+        query_params = parse_qs(parsed_url.query)
+        customs_code = query_params.get("code", [""])[0]
+        invoice_no = query_params.get("invoice", [""])[0]
+
+        if customs_code and invoice_no:
+            return {
+                "type": "asap",
+                "code": customs_code,
+                "invoice": invoice_no,
                 "page_id": page_id,
                 "name": name_text,
                 "raw": raw,
-            })
+            }
+
+    elif is_probably_number(raw):
+        return {
+            "type": "tradlinx",
+            "bl_no": raw,
+            "page_id": page_id,
+            "name": name_text,
+            "raw": raw,
+            "created_time": result.get("created_time"),
+        }
 
-    return items
+    return {
+        "type": "unknown",
+        "page_id": page_id,
+        "name": name_text,
+        "raw": raw,
+    }
 
 
-def check_unipass_status_asap(code, invoice):
-    url = f"https://asap-china.com/guide/unipass_delivery.php?code={code}&invoice={invoice}"
-    response = requests.get(url, headers=UA_HEADERS, timeout=20)
-    soup = BeautifulSoup(response.text, "html.parser")
+def iter_tracking_items():
+    """
+    Status = 'Not started' 인 항목을 페이지 단위로 받아오며 바로 yield
+    (필터는 Notion 서버에서, 100건 넘어도 next_cursor 로 끝까지)
+    """
+    for result in query_database(
+        NOTION_DATABASE_ID,
+        filter=NOT_STARTED_FILTER,
+        properties=TRACKING_PROPERTIES,
+    ):
+        yield parse_tracking_item(result)
 
-    tables = soup.find_all("table")
-    if len(tables) < 2:
-        return []
 
-    table = tables[1]
-    rows = table.find_all("tr")[1:]
+def get_tracking_items():
+    return list(iter_tracking_items())
 
-    steps = []
-    for row in rows:
-        tds = row.find_all("td")
-        if len(tds) > 2:
-            step_text = tds[1].get_text(strip=True)
-            time_text = tds[2].get_text(strip=True)
-            steps.append({"step": step_text, "time": time_text})
 
+def raise_for_lookup(response, site):
+    """
+    200 이 아니면 예외 → run_checks 가 None 으로 돌려줌 (조회 실패)
+    오류 페이지를 '단계 없음'([])으로 파싱해 캐시된 단계를 덮어쓰지 않도록
+    """
+    if response.status_code != 200:
+        raise requests.HTTPError(f"{site} HTTP {response.status_code}", response=response)
+
+
+def check_unipass_status_asap(code, invoice):
+    url = f"https://asap-china.com/guide/unipass_delivery.php?code={code}&invoice={invoice}"
+    response = http_client.get(url, headers=UA_HEADERS, timeout=20)
+    raise_for_lookup(response, "ASAP")
+    steps = parse_asap_steps(response.text)
+    if parse_failed("asap", response.text, steps):
+        capture(url, response.text, kind="asap", reason=f"no steps (HTTP {response.status_code})")
     return steps
 
 
 def fetch_tradlinx_steps(bl_no: str, year: int):
     url = f"https://www.tradlinx.com/ko/unipass?type=2&blNo={bl_no}&blYr={year}"
-    r = requests.get(url, headers=UA_HEADERS, timeout=25)
-    html = r.text
-
-    soup = BeautifulSoup(html, "html.parser")
-    cargo = soup.find("div", class_="cargo-process")
-    if not cargo:
-        return []
-
-    steps = []
-    for pd in cargo.find_all("div", class_="process-detail"):
-        step_el = pd.select_one("ul li.tp-cd")
-        time_el = pd.select_one("ul li.rl-br-dttm")
-        if step_el and time_el:
-            step = step_el.get_text(strip=True)
-            time = time_el.get_text(strip=True)
-            steps.append({"step": step, "time": time})
-
+    r = http_client.get(url, headers=UA_HEADERS, timeout=25)
+    raise_for_lookup(r, "Tradlinx")   # 오류 응답은 "이 연도엔 없음"과 구분 (다음 연도로 넘어가지 않음)
+    steps = parse_tradlinx_steps(r.text)
+    if parse_failed("tradlinx", r.text, steps):
+        capture(url, r.text, kind="tradlinx", reason=f"no steps (HTTP {r.status_code})")
     return steps
 
 
-def check_unipass_status_tradlinx(bl_no: str):
+# BL 번호 앞 4자리가 연도인 경우 (예: 2025XXXXXXXX)
+BL_YEAR_RE = re.compile(r"^(20\d{2})")
+
+
+def candidate_years(bl_no: str, known_year=None, created_time=None):
+    """
+    Tradlinx 에 물어볼 BL 연도 순서
+      1. 지난 실행에서 찾은 연도 (캐시)
+      2. BL 번호 앞자리 연도
+      3. Notion 페이지 생성 연도 (1월에 작년 BL 을 먼저 시도)
+      4. 올해, 작년 (기존 방식)
+    """
     this_year = datetime.now().year
-    for y in [this_year, this_year - 1]:
+    years = []
+
+    if known_year:
+        years.append(int(known_year))
+
+    m = BL_YEAR_RE.match(bl_no or "")
+    if m and this_year - 1 <= int(m.group(1)) <= this_year:
+        years.append(int(m.group(1)))
+
+    if created_time and created_time[:4].isdigit() and int(created_time[:4]) <= this_year:
+        years.append(int(created_time[:4]))
+
+    years += [this_year, this_year - 1]
+    return list(dict.fromkeys(years))
+
+
+def resolve_tradlinx_steps(bl_no: str, years):
+    """
+    years 순서대로 조회, (단계 목록, 찾은 연도) — 어느 연도에도 없으면 ([], None)
+    조회 자체가 실패하면(200 아님 / 연결 오류) 예외 그대로
+    """
+    for y in years:
         steps = fetch_tradlinx_steps(bl_no, y)
         if steps:
-            return steps
-    return []
+            return steps, y
+    return [], None
+
+
+def check_unipass_status_tradlinx(bl_no: str, known_year=None, created_time=None):
+    steps, _ = resolve_tradlinx_steps(bl_no, candidate_years(bl_no, known_year, created_time))
+    return steps
+
+
+# 유니패스 처리 시각 형식 (ASAP: 2025-03-28 09:11:02 / Tradlinx: 2025.03.28 10:20)
+STEP_TIME_RE = re.compile(r"(20\d{2})\D?(\d{2})\D?(\d{2})\D*(\d{2})?\D?(\d{2})?\D?(\d{2})?")
+
+
+def step_time_iso(time_text):
+    """처리 시각 문자열 → ISO 8601 (KST), 해석 못 하면 None"""
+    m = STEP_TIME_RE.search(time_text or "")
+    if not m:
+        return None
+    y, mo, d, h, mi, sec = (g or "00" for g in m.groups())
+    return f"{y}-{mo}-{d}T{h}:{mi}:{sec}+09:00"
+
+
+def latest_step(steps):
+    """처리 시각이 가장 늦은 단계 (시각이 같으면 목록에서 뒤쪽)"""
+    if not steps:
+        return None
+    return max(reversed(steps), key=lambda s: step_time_iso(s.get("time")) or "")
+
+
+def step_properties(step, step_prop, time_prop):
+    """최근 단계 / 처리 시각 속성 (설정된 것만)"""
+    properties = {}
+    if step_prop and step:
+        properties[step_prop] = {"rich_text": [{"text": {"content": step["step"]}}]}
+    iso = step_time_iso(step.get("time")) if step else None
+    if time_prop and iso:
+        properties[time_prop] = {"date": {"start": iso}}
+    return properties
 
 
 def update_notion_status(page_id, processed_at):
-    url = f"https://api.notion.com/v1/pages/{page_id}"
-    payload = {
-        "properties": {
-            "Status": {
-                "status": {"name": "통관 완료"}
-            }
+    """
+    Status → 통관 완료 (+ 단계 / 처리 시각 속성이 설정돼 있으면 같이)
+    쓰기 큐에 넣고 바로 반환 (전송은 notion_writer 백그라운드 스레드)
+    """
+    properties = {
+        "Status": {
+            "status": {"name": "통관 완료"}
         }
     }
+    properties.update(step_properties(
+        {"step": CLEARED_STEP, "time": processed_at},
+        NOTION_STEP_PROPERTY,
+        NOTION_STEP_TIME_PROPERTY,
+    ))
+    get_writer().update_page(
+        page_id,
+        properties,
+        label=f"[🟢 Status 업데이트 완료] {page_id} → 통관 완료 ({processed_at})",
+    )
+
+
+def update_notion_progress(page_id, step):
+    """진행 중인 건의 최근 단계 / 처리 시각만 갱신 (속성 설정이 없으면 아무것도 안 함)"""
+    properties = step_properties(step, NOTION_STEP_PROPERTY, NOTION_STEP_TIME_PROPERTY)
+    if not properties:
+        return False
+    get_writer().update_page(
+        page_id,
+        properties,
+        label=f"[🔵 진행 단계 업데이트] {page_id} → {step['step']} ({step.get('time', '')})",
+    )
+    return True
+
+
+def check_item(it):
+    """항목 유형에 맞는 조회 함수 실행 (동시 실행 풀에서 호출)"""
+    if "cached_steps" in it:
+        return it["cached_steps"]
+    if it["type"] == "asap":
+        return check_unipass_status_asap(it["code"], it["invoice"])
+    if it["type"] == "tradlinx":
+        years = candidate_years(it["bl_no"], it.get("bl_year"), it.get("created_time"))
+        steps, year = resolve_tradlinx_steps(it["bl_no"], years)
+        if year:
+            it["bl_year"] = year   # 상태 캐시에 저장 → 다음 실행에서 먼저 시도
+        return steps
+    return []
+
+
+def handle_result(it, steps, new_steps=None):
+    """
+    조회 결과 반영: 통관목록심사완료면 Status 업데이트 후 True
+    아직이면 새로 나타난 단계(new_steps)가 있을 때만 최근 단계 속성 갱신
+    (new_steps 를 안 넘기면 전체 단계를 새 단계로 취급)
+    """
+    key = it.get("invoice") or it.get("bl_no") or it.get("raw", "")
+    target = next((s for s in steps if s["step"] == CLEARED_STEP), None)
+
+    if target:
+        processed_at = target["time"]
+        print(f"[🎉 통관목록심사완료 발견] {key} / {it.get('name', '')} / {processed_at}")
+        notify("cleared", f"{key} / {it.get('name', '')} / {processed_at}", key=key)
+        # 'Not started' 로 다시 조회됐다는 건 아직 반영이 안 됐다는 뜻 → 새 단계 여부와 관계없이 기록
+        update_notion_status(it["page_id"], processed_at)
+        return True
 
-    resp = requests.patch(url, headers=NOTION_HEADERS, json=payload)
-    if resp.status_code == 200:
-        print(f"[🟢 Status 업데이트 완료] {page_id} → 통관 완료")
-    else:
-        print(f"[⚠️ 업데이트 실패] {resp.status_code} / {resp.text}")
+    new_steps = steps if new_steps is None else new_steps
+    if new_steps:
+        latest = latest_step(new_steps)
+        print(f"  └ 새 단계 {len(new_steps)}건, 최근: {latest['step']} / {latest.get('time', '')}")
+        update_notion_progress(it["page_id"], latest)
 
+    return False
 
-def main():
+
+def main(workers=None):
     print("[🚀 유니패스 자동 추적 시작]\n")
+    started = time.perf_counter()
+    checked = 0
 
-    items = get_tracking_items()
     any_found = False
+    cache = StatusCache()
+
+    def checkable():
+        for it in iter_tracking_items():
+            if it["type"] in ("asap", "tradlinx"):
+                cache.attach_cached(it)
+                yield it
+            else:
+                print(f"[⚠️ 알 수 없는 형식] {it.get('name', '')} / {it.get('raw', '')}")
 
-    for it in items:
+    # 조회는 동시에, Notion 반영은 원래 순서대로
+    for it, steps in run_checks(checkable(), check_item, workers=workers):
+        progress("checked")
+        checked += 1
         name = it.get("name", "")
-        raw = it.get("raw", "")
+        source = " (캐시)" if "cached_steps" in it else ""
 
         if it["type"] == "asap":
-            invoice = it["invoice"]
-            print(f"[🔍 검사 중 - ASAP] {invoice} / {name}")
-            steps = check_unipass_status_asap(it["code"], invoice)
-
-        elif it["type"] == "tradlinx":
-            bl_no = it["bl_no"]
-            print(f"[🔍 검사 중 - TRADLINX] {bl_no} / {name}")
-            steps = check_unipass_status_tradlinx(bl_no)
-
+            print(f"[🔍 검사 완료 - ASAP{source}] {it['invoice']} / {name}")
         else:
-            print(f"[⚠️ 알 수 없는 형식] {name} / {raw}")
+            print(f"[🔍 검사 완료 - TRADLINX{source}] {it['bl_no']} / {name}")
+
+        if steps is None:
+            progress("failed")
             continue
+        new_steps = cache.update_from(it, steps)
 
-        target = next((s for s in steps if s["step"] == "통관목록심사완료"), None)
-        if target:
-            processed_at = target["time"]
-            key = it.get("invoice") or it.get("bl_no") or raw
-            print(f"[🎉 통관목록심사완료 발견] {key} / {name} / {processed_at}")
-            update_notion_status(it["page_id"], processed_at)
+        if handle_result(it, steps, new_steps):
             any_found = True
+            progress("cleared")
 
     if not any_found:
         print("[ℹ️ 아직 심사완료 없음]")
 
+    cache.save()
+    flush_and_report()
+    record_run("unipass_check", checked, time.perf_counter() - started)
+
 
 if __name__ == "__main__":
     main()
+    flush_notifications()
+    dump_summary()
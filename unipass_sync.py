@@ -0,0 +1,120 @@
+import time
+
+import unipass_check
+import unipass_check_ledger
+from check_pool import run_checks
+from jobs import progress, set_progress
+from metrics import dump_summary, record_run
+from notion_writer import flush_and_report
+from notifier import flush_notifications
+from status_cache import StatusCache, cache_key
+
+# ─────────────────────────────────────────────────────────────
+# 송장 DB + 장부 DB 통합 유니패스 추적 (한 번의 실행으로 두 DB 처리)
+#
+# 흐름:
+#   1. 두 DB 에서 'Not started' 항목 조회 (속성 이름은 DB 별로 다름)
+#        송장 DB: Status / 조회링크 / 성함
+#        장부 DB: 배송상태 / 배송조회링크 / 이름
+#   2. 같은 송장(통관부호+송장번호) 또는 BL 번호는 하나로 묶어 한 번만 조회
+#   3. 결과를 그 송장을 가진 모든 페이지에 DB 별 방식으로 반영
+#      (통관 완료가 아니면 지난 조회 이후 새 단계가 생긴 건만 Notion 쓰기)
+#
+# 환경변수: NOTION_TOKEN, NOTION_DATABASE_ID(송장 DB), LEDGER_DB_ID(장부 DB)
+#           둘 중 설정된 DB 만 처리
+# ─────────────────────────────────────────────────────────────
+
+# DB 별 대상 목록 / 결과 반영 함수
+SOURCES = {
+    "invoice": (unipass_check.iter_tracking_items, unipass_check.handle_result),
+    "ledger": (unipass_check_ledger.iter_tracking_items, unipass_check_ledger.handle_result),
+}
+
+
+def enabled_sources():
+    if unipass_check.NOTION_DATABASE_ID:
+        yield "invoice"
+    if unipass_check_ledger.LEDGER_DB_ID:
+        yield "ledger"
+
+
+def load_items():
+    """설정된 모든 DB 의 조회 가능 항목 (item["db"] 에 출처 표시)"""
+    for db in enabled_sources():
+        iter_items, _ = SOURCES[db]
+        for it in iter_items():
+            if it["type"] in ("asap", "tradlinx"):
+                it["db"] = db
+                yield it
+            else:
+                print(f"[⚠️ 알 수 없는 형식] {it.get('name', '')} / {it.get('raw', '')}")
+
+
+def group_by_shipment(items):
+    """
+    같은 배송건을 가리키는 페이지를 묶음 (처음 나온 순서 유지)
+    반환: 조회용 항목 목록, 각 항목의 "pages" 에 해당 페이지들
+    """
+    shipments = {}
+    for it in items:
+        key = cache_key(it)
+        if key not in shipments:
+            shipments[key] = dict(it, pages=[])
+        shipments[key]["pages"].append(it)
+    return list(shipments.values())
+
+
+def apply_result(shipment, steps, new_steps=None):
+    """
+    조회 결과를 묶인 모든 페이지에 반영, 통관 완료된 페이지 수 반환
+    new_steps: 지난 조회 이후 새로 나타난 단계 (없으면 진행 중인 건은 쓰기 생략)
+    """
+    cleared = 0
+    for page in shipment["pages"]:
+        _, handle = SOURCES[page["db"]]
+        if handle(page, steps, new_steps):
+            cleared += 1
+    return cleared
+
+
+def main(workers=None):
+    print("[🚀 유니패스 통합 추적 시작 (송장 DB + 장부 DB)]\n")
+    started = time.perf_counter()
+
+    cache = StatusCache()
+    items = list(load_items())
+    shipments = group_by_shipment(items)
+
+    cached = sum(cache.attach_cached(sh) for sh in shipments)
+    print(f"[📋 조회 대상: 페이지 {len(items)}건 → 배송 {len(shipments)}건 (캐시 사용 {cached}건)]\n")
+    set_progress(total=len(shipments), cached=cached)
+
+    cleared = 0
+    for sh, steps in run_checks(shipments, unipass_check.check_item, workers=workers):
+        key = sh.get("invoice") or sh.get("bl_no")
+        dbs = ", ".join(p["db"] for p in sh["pages"])
+        progress("checked")
+        print(f"[🔍 검사 완료{' (캐시)' if 'cached_steps' in sh else ''}] {key} / {sh.get('name', '')} ({dbs})")
+
+        if steps is None:
+            progress("failed")
+            continue
+        new_steps = cache.update_from(sh, steps)
+        done = apply_result(sh, steps, new_steps)
+        cleared += done
+        progress("cleared", done)
+
+    if cleared:
+        print(f"\n[✅ 통관 완료 {cleared}건]")
+    else:
+        print("\n[ℹ️ 아직 통관 완료 없음]")
+
+    cache.save()
+    flush_and_report()
+    record_run("unipass", len(shipments), time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
+    flush_notifications()
+    dump_summary()